@@ -1,13 +1,19 @@
 """General purpose tools for writing TSP experiments.
 
-This module has five component submodules. The `tsp.core.tsp` submodule has object-oriented
+This module has eleven component submodules. The `tsp.core.tsp` submodule has object-oriented
 containers for both 2-dimensional and n-dimensional TSPs, including procedures for randomly
-generating 2-dimensional TSPs.
+generating 2-dimensional TSPs. The batched kernels it uses to compute distance matrices live in
+the `tsp.core.distances` submodule.
 
-The `tsp.core.solvers` submodule implements random, optimal, and human-approximate solvers. The
-optimal solver uses the [Concorde](https://www.math.uwaterloo.ca/tsp/concorde.html) backend. The
-human-approximate solver uses a hierarchical clustering ("pyramid") algorithm implemented in the
-`tsp.core.pyramid` submodule.
+The `tsp.core.solvers` submodule implements random, constructive, optimal, and human-approximate
+solvers. The constructive solvers (nearest neighbor, greedy edge, space-filling curve, and minimum
+spanning tree heuristics) are implemented in the `tsp.core.constructive` submodule. The optimal
+solver uses the [Concorde](https://www.math.uwaterloo.ca/tsp/concorde.html) backend, which is run by
+the `tsp.core.concorde` submodule. The human-approximate solver uses a hierarchical clustering ("pyramid") algorithm implemented in the
+`tsp.core.pyramid` submodule. Tours can be improved by 2-opt and Or-opt local search, implemented in
+the `tsp.core.local_search` submodule. The `tsp.core.registry` submodule lets solvers be looked up
+by name (with metadata on what each can do), importing their backends only on first use, and the
+`tsp.core.anytime` submodule runs solvers under time limits, reporting the best tour found so far.
 
 The `tsp.core.save` submodule implements procedures for serializing TSP objects and tours.
 
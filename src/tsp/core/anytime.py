@@ -0,0 +1,118 @@
+"""Runs solvers under a time budget, reporting the best tour found so far as they go.
+
+An anytime solver is a solver (see `tsp.core.solvers`) with an `anytime` attribute: a generator
+procedure `anytime(tsp, stop, **kwargs)`, which takes the same keyword arguments as the solver itself
+(including `time_limit`, if there is one) and produces tours as it finds them. The first tour should
+come quickly, and each later tour should be an improvement. `stop` is a procedure without arguments
+which returns True once the solver should stop searching; an anytime solver checks it regularly, and
+once it returns True, produces its best tour (if it hasn't already) and finishes.
+`tsp.core.solvers.two_opt_solve` and `tsp.core.solvers.ils_solve` are anytime solvers.
+
+`solve_anytime` runs a solver until it finishes, its time limit runs out, or it is cancelled (with a
+`threading.Event`, e.g. set by another thread), and returns the best tour found. A callback, if given,
+is called with a `Progress` record every time a better tour is found:
+
+```python
+def report(progress):
+    print(f'{progress.seconds:.2f} s: {progress.length:.1f}')
+
+tour = solve_anytime(problem, 'ils', time_limit=0.5, callback=report)
+```
+
+The time limit covers everything the solver does, including finding its starting tour, though a
+solver can only stop between the steps at which it checks `stop` (for instance, the pyramid tour
+which `ils_solve` starts from is always finished). Solvers which aren't anytime solvers are simply
+run to completion, and report a single tour.
+
+`tsp.core.tsp.N_TSP.solve` and `tsp.experiment.batch_solver.solve_batch` go through `solve_anytime`
+when given a callback or a cancellation event.
+"""
+
+
+from threading import Event
+import time
+from typing import Callable, Iterator, NamedTuple, Type, Union
+
+from numpy.typing import NDArray
+import numpy as np
+
+from tsp.core.registry import get_solver
+from tsp.core.tsp import N_TSP
+
+
+class Progress(NamedTuple):
+    """A better tour found by a solver, as reported by `solve_anytime`.
+
+    Attributes:
+        tour (NDArray): tour as vertex indices
+        length (float): length of the tour
+        seconds (float): time since the solver was started
+        improvements (int): number of better tours found so far, including this one
+    """
+    tour: NDArray
+    length: float
+    seconds: float
+    improvements: int
+
+
+def _stopper(deadline: float, cancel: Event) -> Callable[[], bool]:
+    def stop():
+        return (deadline is not None and time.perf_counter() >= deadline) or (cancel is not None and cancel.is_set())
+    return stop
+
+
+def anytime_trace(tsp: N_TSP, solver: Union[str, Callable, Type], time_limit: float = None, cancel: Event = None,
+                  **kwargs) -> Iterator[Progress]:
+    """Run a solver, producing each better tour as it is found (see `solve_anytime`).
+
+    Args:
+        tsp (N_TSP): TSP to solve
+        solver (Union[str, Callable, Type]): a solver function from `tsp.core.solvers`, or the name of
+            a solver in `tsp.core.registry`
+        time_limit (float, optional): Time budget, in seconds. Defaults to None (no limit).
+        cancel (Event, optional): Event which stops the solver when set. Defaults to None.
+
+    Yields:
+        Iterator[Progress]: better tours
+    """
+    if isinstance(solver, str):
+        solver = get_solver(solver)
+    started = time.perf_counter()
+    if hasattr(solver, 'anytime'):
+        stop = _stopper(None if time_limit is None else started + time_limit, cancel)
+        if time_limit is not None:
+            kwargs['time_limit'] = time_limit
+        tours = solver.anytime(tsp, stop, **kwargs)
+    else:
+        tours = iter([tsp.solve(solver, **kwargs)])
+    best_length, improvements = np.inf, 0
+    for tour in tours:
+        length = tsp.score(tour)
+        if length < best_length:
+            best_length, improvements = length, improvements + 1
+            yield Progress(np.asarray(tour), length, time.perf_counter() - started, improvements)
+
+
+def solve_anytime(tsp: N_TSP, solver: Union[str, Callable, Type], time_limit: float = None,
+                  callback: Callable[[Progress], None] = None, cancel: Event = None, **kwargs) -> NDArray:
+    """Run a solver until it finishes, its time limit runs out, or it is cancelled, and return the best
+    tour it found. Solvers which aren't anytime solvers are run to completion.
+
+    Args:
+        tsp (N_TSP): TSP to solve
+        solver (Union[str, Callable, Type]): a solver function from `tsp.core.solvers`, or the name of
+            a solver in `tsp.core.registry`
+        time_limit (float, optional): Time budget, in seconds. Defaults to None (no limit).
+        callback (Callable[[Progress], None], optional): Procedure called with each better tour.
+            Defaults to None.
+        cancel (Event, optional): Event which stops the solver when set. Defaults to None.
+
+    Returns:
+        NDArray: best tour found
+    """
+    best = None
+    for progress in anytime_trace(tsp, solver, time_limit, cancel, **kwargs):
+        best = progress.tour
+        if callback is not None:
+            callback(progress)
+    return best
@@ -0,0 +1,156 @@
+"""Runs the [Concorde](https://www.math.uwaterloo.ca/tsp/concorde.html) TSP solver, which must be
+installed separately (the `concorde` executable has to be on the PATH, or passed explicitly). The
+procedures of this module are wrapped by `tsp.core.solvers.concorde_solve`.
+
+Every call to `solve` writes its problem to a fresh temporary directory and runs Concorde there, so
+any number of solves can run at the same time, in the same process or not, without clobbering each
+other's files. Problems are written in the TSPLIB format. Euclidean problems in 2 or 3 dimensions are
+written as coordinates (`EUC_2D` or `EUC_3D`), which takes O(n) space; other problems are written as
+the upper triangle of their edge matrix (`EXPLICIT`, `UPPER_ROW`).
+
+Concorde only works with integer edge lengths (it rounds Euclidean distances to the nearest
+integer), so coordinates and edge lengths are scaled up before they are written. By default the
+scale is the largest power of ten which keeps the length of any tour safely within Concorde's
+integer range.
+
+`solve_batch` solves a list of problems, one at a time unless it is given more workers, in which case
+it keeps that many Concorde processes running in parallel.
+"""
+
+
+from concurrent.futures import ThreadPoolExecutor
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import List
+
+from numpy.typing import NDArray
+import numpy as np
+
+from tsp.core.tsp import N_TSP
+
+
+MAX_TOUR_LENGTH = 2 ** 28  # keep tour lengths well within Concorde's (32-bit) integer range
+
+
+class ConcordeError(RuntimeError):
+    """Concorde could not be run, failed, or ran out of time."""
+
+
+def _default_scale(n: int, longest: float) -> float:
+    if longest <= 0:
+        return 1.
+    return 10. ** math.floor(math.log10(MAX_TOUR_LENGTH / (n * longest)))
+
+
+def write_tsplib(tsp: N_TSP, path: str, scale: float = None, name: str = 'problem') -> float:
+    """Write a problem in the TSPLIB format read by Concorde.
+
+    Args:
+        tsp (N_TSP): TSP to write
+        path (str): path of the file to write
+        scale (float, optional): Factor to scale coordinates or edge lengths by. Defaults to None
+            (the largest power of ten which keeps every tour length below MAX_TOUR_LENGTH).
+        name (str, optional): Name of the problem. Defaults to 'problem'.
+
+    Returns:
+        float: scale used
+    """
+    n, dimensions = tsp.cities.shape
+    if tsp.euclidean and dimensions in (2, 3):
+        points = tsp.cities.astype(np.float64)
+        if scale is None:
+            scale = _default_scale(n, float(np.linalg.norm(points.max(axis=0) - points.min(axis=0))))
+        header = f'EDGE_WEIGHT_TYPE: EUC_{dimensions}D\nNODE_COORD_SECTION'
+        data = np.column_stack([np.arange(1, n + 1), points * scale])
+        fmt = ['%d'] + ['%.6f'] * dimensions
+    else:
+        E = tsp.to_edge_matrix(np.float64, condensed=True)
+        if scale is None:
+            scale = _default_scale(n, float(E.max()) if len(E) else 0.)
+        header = 'EDGE_WEIGHT_TYPE: EXPLICIT\nEDGE_WEIGHT_FORMAT: UPPER_ROW\nEDGE_WEIGHT_SECTION'
+        data = np.rint(E * scale).astype(np.int64)
+        fmt = '%d'
+    with open(path, 'w') as f:
+        f.write(f'NAME: {name}\nTYPE: TSP\nDIMENSION: {n}\n{header}\n')
+        np.savetxt(f, data, fmt=fmt)
+        f.write('EOF\n')
+    return scale
+
+
+def read_solution(path: str) -> NDArray:
+    """Read a tour written by Concorde.
+
+    Args:
+        path (str): path of the solution file
+
+    Returns:
+        NDArray: tour as vertex indices
+    """
+    with open(path) as f:
+        values = f.read().split()
+    n = int(values[0])
+    return np.array(values[1:n + 1], dtype=int)
+
+
+def solve(tsp: N_TSP, timeout: float = None, scale: float = None, seed: int = None,
+          executable: str = 'concorde') -> NDArray:
+    """Find an optimal tour with Concorde.
+
+    Args:
+        tsp (N_TSP): TSP to solve
+        timeout (float, optional): Time limit, in seconds, after which Concorde is killed. Defaults to None.
+        scale (float, optional): Factor to scale coordinates or edge lengths by (see `write_tsplib`). Defaults to None.
+        seed (int, optional): Random seed for Concorde. Defaults to None.
+        executable (str, optional): Concorde executable. Defaults to 'concorde'.
+
+    Raises:
+        ConcordeError: if Concorde cannot be found, fails, or times out
+
+    Returns:
+        NDArray: tour as vertex indices, starting at 0
+    """
+    n = tsp.cities.shape[0]
+    if n <= 3:
+        return np.arange(n)
+    command = shutil.which(executable)
+    if command is None:
+        raise ConcordeError(f'cannot find the Concorde executable {executable!r}')
+    with tempfile.TemporaryDirectory(prefix='concorde-') as workdir:
+        problem = os.path.join(workdir, 'problem.tsp')
+        solution = os.path.join(workdir, 'problem.sol')
+        write_tsplib(tsp, problem, scale)
+        args = [command, '-x', '-o', solution]
+        if seed is not None:
+            args += ['-s', str(seed)]
+        try:
+            result = subprocess.run(args + [problem], cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                    timeout=timeout)
+        except subprocess.TimeoutExpired as e:
+            raise ConcordeError(f'Concorde timed out after {timeout} seconds') from e
+        if result.returncode != 0 or not os.path.exists(solution):
+            output = result.stdout.decode(errors='replace').strip().splitlines()[-5:]
+            raise ConcordeError(f'Concorde failed (exit code {result.returncode}): ' + ' / '.join(output))
+        tour = read_solution(solution)
+    if sorted(tour.tolist()) != list(range(n)):
+        raise ConcordeError('Concorde produced an invalid tour')
+    return np.roll(tour, -int(np.flatnonzero(tour == 0)[0]))
+
+
+def solve_batch(problems: List[N_TSP], workers: int = 1, **kwargs) -> List[NDArray]:
+    """Solve a batch of problems with `solve`, optionally running several Concorde processes at once.
+
+    Args:
+        problems (List[N_TSP]): TSPs to solve
+        workers (int, optional): Number of Concorde processes to run at once. Defaults to 1 (solve the
+            problems one at a time).
+
+    Returns:
+        List[NDArray]: tours, in the same order as the problems
+    """
+    if workers <= 1:
+        return [solve(p, **kwargs) for p in problems]
+    with ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(lambda p: solve(p, **kwargs), problems))
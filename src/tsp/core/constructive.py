@@ -0,0 +1,257 @@
+"""Builds tours from scratch with fast constructive heuristics. The procedures of this module are
+wrapped by solvers in `tsp.core.solvers` (`nearest_neighbor_solve`, `greedy_solve`, `hilbert_solve`
+and `mst_solve`). They take milliseconds to seconds even on problems of hundreds of thousands of
+cities, which makes them good baselines, and good starting tours for local search (see
+`tsp.core.solvers.two_opt_solve`).
+
+`nearest_neighbor` starts at a city and always moves on to the nearest city not yet visited. The
+nearest unvisited city is found with a KD-tree, which is rebuilt over the unvisited cities whenever
+half of the cities it holds have been visited. Tours are typically about 25% longer than optimal.
+
+`greedy_edge` adds edges to the tour from shortest to longest, skipping any edge which would give a
+city three edges or close a cycle too early, until the edges form a single tour. Only the edges
+between each city and its nearest neighbors are considered at first; the fragments these leave are
+then joined by the same rule, considering the edges between their nearest endpoints. Tours are
+typically about 15-20% longer than optimal.
+
+`space_filling_curve` visits the cities in the order in which a Hilbert curve (in any number of
+dimensions) passes through them. It is the fastest of these heuristics, but tours are typically about
+25-40% longer than optimal.
+
+`mst_tour` walks a minimum spanning tree depth first, skipping cities already visited (the "double
+tree" heuristic, a simplified Christofides algorithm), so tours are never more than twice as long as
+optimal in Euclidean problems. The tree of a 2D or 3D Euclidean problem is found from its Delaunay
+triangulation, which contains it.
+
+The heuristics only use the coordinates of the cities for Euclidean problems. Other problems (such as
+`tsp.extra.obstacles.TSP_O`) are handled with the cached edge matrix (see
+`tsp.core.tsp.N_TSP.to_edge_matrix`), except by `space_filling_curve`, which only ever looks at the
+coordinates of the cities.
+"""
+
+
+from typing import List
+
+from numpy.typing import NDArray
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components, depth_first_order, minimum_spanning_tree
+from scipy.spatial import cKDTree, Delaunay
+
+from tsp.core.tsp import N_TSP
+
+
+def nearest_neighbor(tsp: N_TSP, start: int = 0) -> NDArray:
+    """Build a tour by always moving on to the nearest unvisited city.
+
+    Args:
+        tsp (N_TSP): TSP to solve
+        start (int, optional): City to start at. Defaults to 0.
+
+    Returns:
+        NDArray: tour as vertex indices, starting at `start`
+    """
+    n = tsp.cities.shape[0]
+    if n == 0:
+        return np.arange(0)
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
+    tour = [start]
+    if not tsp.euclidean:
+        E = tsp.to_edge_matrix(np.float64)
+        for _ in range(n - 1):
+            row = np.where(visited, np.inf, E[tour[-1]])
+            city = int(np.argmin(row))
+            visited[city] = True
+            tour.append(city)
+        return np.array(tour)
+    points = tsp.cities.astype(np.float64)
+    nodes = np.arange(n)
+    tree = cKDTree(points)
+    for remaining in range(n - 1, 0, -1):
+        if 2 * remaining < len(nodes) and len(nodes) > 64:
+            nodes = np.flatnonzero(~visited)
+            tree = cKDTree(points[nodes])
+        k = 8
+        while True:
+            _, found = tree.query(points[tour[-1]], k=min(k, len(nodes)))
+            candidates = nodes[np.atleast_1d(found)]
+            free = ~visited[candidates]
+            if free.any():
+                break
+            k *= 2
+        city = int(candidates[np.argmax(free)])
+        visited[city] = True
+        tour.append(city)
+    return np.array(tour)
+
+
+def _find(parent: List[int], a: int) -> int:
+    while parent[a] != a:
+        parent[a] = parent[parent[a]]
+        a = parent[a]
+    return a
+
+
+def _candidate_edges(tsp: N_TSP, nodes: NDArray, k: int) -> List[tuple]:
+    # Edges (length, a, b) between each of the nodes and its k nearest neighbors among the nodes,
+    # shortest first
+    if len(nodes) < 2:
+        return []
+    k = min(k, len(nodes) - 1)
+    if tsp.euclidean:
+        points = tsp.cities[nodes].astype(np.float64)
+        lengths, found = cKDTree(points).query(points, k=k + 1)
+    else:
+        E = tsp.to_edge_matrix(np.float64)[np.ix_(nodes, nodes)]
+        np.fill_diagonal(E, np.inf)
+        found = np.argpartition(E, k - 1, axis=1)[:, :k]
+        lengths = np.take_along_axis(E, found, axis=1)
+    a = np.repeat(nodes, found.shape[1])
+    b = nodes[found.ravel()]
+    lengths = lengths.ravel()
+    keep = a < b
+    a, b, lengths = a[keep], b[keep], lengths[keep]
+    order = np.lexsort((b, a, lengths))
+    return list(zip(lengths[order].tolist(), a[order].tolist(), b[order].tolist()))
+
+
+def greedy_edge(tsp: N_TSP, neighbors: int = 10) -> NDArray:
+    """Build a tour by adding edges from shortest to longest, as long as they keep the tour valid
+    (no city has more than two edges, and there is no cycle until the last edge).
+
+    Args:
+        tsp (N_TSP): TSP to solve
+        neighbors (int, optional): Number of nearest neighbors of each city to consider edges to at
+            first. Defaults to 10.
+
+    Returns:
+        NDArray: tour as vertex indices, starting at 0
+    """
+    n = tsp.cities.shape[0]
+    if n <= 3:
+        return np.arange(n)
+    parent = list(range(n))
+    degree = [0] * n
+    adjacency = [[] for _ in range(n)]
+    edges = 0
+    nodes = np.arange(n)
+    k = max(neighbors, 2)  # the nearest other endpoint is always among the two nearest endpoints
+    while edges < n - 1:
+        for _, a, b in _candidate_edges(tsp, nodes, k):
+            if degree[a] == 2 or degree[b] == 2:
+                continue
+            root_a, root_b = _find(parent, a), _find(parent, b)
+            if root_a == root_b:
+                continue
+            parent[root_a] = root_b
+            degree[a] += 1
+            degree[b] += 1
+            adjacency[a].append(b)
+            adjacency[b].append(a)
+            edges += 1
+        nodes = np.flatnonzero(np.array(degree) < 2)
+        k = 2
+    previous, city = -1, int(nodes[0])
+    tour = []
+    for _ in range(n):
+        tour.append(city)
+        previous, city = city, next((c for c in adjacency[city] if c != previous), -1)
+    tour = np.array(tour)
+    return np.roll(tour, -int(np.flatnonzero(tour == 0)[0]))
+
+
+def _hilbert_keys(coords: NDArray, bits: int) -> NDArray:
+    # Position along the Hilbert curve of each point, given integer coordinates of the given number of
+    # bits (J. Skilling, "Programming the Hilbert curve", 2004)
+    X = coords.astype(np.uint64)
+    dimensions = X.shape[1]
+    Q = 1 << (bits - 1)
+    while Q > 1:
+        P = np.uint64(Q - 1)
+        for i in range(dimensions):
+            high = (X[:, i] & np.uint64(Q)) != 0
+            if i == 0:
+                X[:, 0] = np.where(high, X[:, 0] ^ P, X[:, 0])
+                continue
+            t = np.where(high, np.uint64(0), (X[:, 0] ^ X[:, i]) & P)
+            X[:, 0] = np.where(high, X[:, 0] ^ P, X[:, 0] ^ t)
+            X[:, i] ^= t
+        Q >>= 1
+    for i in range(1, dimensions):
+        X[:, i] ^= X[:, i - 1]
+    t = np.zeros(len(X), dtype=np.uint64)
+    Q = 1 << (bits - 1)
+    while Q > 1:
+        t ^= np.where((X[:, -1] & np.uint64(Q)) != 0, np.uint64(Q - 1), np.uint64(0))
+        Q >>= 1
+    X ^= t[:, None]
+    keys = np.zeros(len(X), dtype=np.uint64)
+    for b in range(bits - 1, -1, -1):
+        for i in range(dimensions):
+            keys = (keys << np.uint64(1)) | ((X[:, i] >> np.uint64(b)) & np.uint64(1))
+    return keys
+
+
+def space_filling_curve(tsp: N_TSP, bits: int = 16) -> NDArray:
+    """Build a tour by visiting the cities in the order of a Hilbert curve passing through them.
+
+    Args:
+        tsp (N_TSP): TSP to solve
+        bits (int, optional): Resolution of the curve, as the number of bits per coordinate (reduced
+            so that positions along the curve fit in 63 bits). Defaults to 16.
+
+    Returns:
+        NDArray: tour as vertex indices
+    """
+    n, dimensions = tsp.cities.shape
+    if n <= 3:
+        return np.arange(n)
+    bits = max(1, min(bits, 63 // dimensions))
+    points = tsp.cities.astype(np.float64)
+    low = points.min(axis=0)
+    span = float((points.max(axis=0) - low).max()) or 1.
+    coords = np.floor((points - low) / span * ((1 << bits) - 1)).astype(np.int64)
+    return np.argsort(_hilbert_keys(coords, bits), kind='stable')
+
+
+def _spanning_graph(tsp: N_TSP) -> coo_matrix:
+    # A connected graph containing a minimum spanning tree: the Delaunay triangulation of a 2D or 3D
+    # Euclidean problem, or else the complete graph. Zero-length edges are given the smallest positive
+    # length, since sparse graphs leave them out.
+    n, dimensions = tsp.cities.shape
+    if tsp.euclidean and dimensions in (2, 3) and n > dimensions + 1:
+        points = tsp.cities.astype(np.float64)
+        try:
+            simplices = Delaunay(points).simplices
+        except RuntimeError:  # degenerate (e.g. collinear) cities
+            simplices = None
+        if simplices is not None:
+            a = np.concatenate([simplices[:, i] for i in range(dimensions + 1) for _ in range(i)])
+            b = np.concatenate([simplices[:, j] for i in range(dimensions + 1) for j in range(i)])
+            pairs = np.unique(np.sort(np.column_stack([a, b]), axis=1), axis=0)
+            a, b = pairs[:, 0], pairs[:, 1]
+            lengths = np.maximum(np.linalg.norm(points[a] - points[b], axis=1), np.finfo(np.float64).tiny)
+            graph = coo_matrix((lengths, (a, b)), shape=(n, n))
+            if connected_components(graph, directed=False, return_labels=False) == 1:
+                return graph
+    E = np.maximum(tsp.to_edge_matrix(np.float64), np.finfo(np.float64).tiny)
+    np.fill_diagonal(E, 0)
+    return coo_matrix(np.triu(E))
+
+
+def mst_tour(tsp: N_TSP, start: int = 0) -> NDArray:
+    """Build a tour by walking a minimum spanning tree depth first (the "double tree" heuristic).
+
+    Args:
+        tsp (N_TSP): TSP to solve
+        start (int, optional): City to start at (the root of the tree). Defaults to 0.
+
+    Returns:
+        NDArray: tour as vertex indices, starting at `start`
+    """
+    n = tsp.cities.shape[0]
+    if n <= 3:
+        return np.roll(np.arange(n), -start)
+    tree = minimum_spanning_tree(_spanning_graph(tsp))
+    return depth_first_order(tree, start, directed=False, return_predecessors=False)
@@ -0,0 +1,295 @@
+"""Batched distance-matrix kernels backing `tsp.core.tsp.N_TSP.to_edge_matrix`.
+
+An edge kernel is any procedure `kernel(a, b)` which takes two arrays of city indices and returns
+an array of the edge lengths between `a[i]` and `b[i]` (see `tsp.core.tsp.N_TSP.edge_batch`).
+`edge_matrix` drives such a kernel over the upper triangle of the distance matrix in blocks of
+rows, so that no more than `chunk_size` edges are ever in flight at once, no matter the size of the
+problem. The result is produced either in square form (n x n) or in condensed form, which stores
+only the upper triangle row by row (the same layout as `scipy.spatial.distance.pdist`) and takes up
+half the memory.
+
+`euclidean` is the kernel used by `N_TSP`. TSPs whose edges are not Euclidean override
+`N_TSP.edge_batch` with their own kernels.
+
+`EdgeCache` is the store behind `N_TSP.edge_cache`, which keeps the edge matrices of a problem
+around until the problem is modified. Each problem carries a version number which is incremented
+whenever it is mutated (see `N_TSP.invalidate`), and the cache drops everything it holds as soon as
+it is asked for a matrix at a newer version. Matrices are built lazily on the first request, and
+other forms (square or condensed, lower precision) are derived from stored matrices rather than
+recomputed. An optional memory cap (`EdgeCache.max_bytes`) is enforced by evicting square forms
+first, keeping a condensed copy of each, and then condensed forms. The `hits` and `misses` counters
+can be used to check that a workload is actually being served from the cache:
+
+```python
+problem.edge_cache.max_bytes = 200 * 2 ** 20  # keep at most 200 MiB of matrices
+for tour in tours:
+    problem.score(tour)
+print(problem.edge_cache.hits, problem.edge_cache.misses)
+```
+"""
+
+
+from typing import Callable, Dict, Iterator, Tuple
+from numpy.typing import DTypeLike, NDArray
+import numpy as np
+
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # edges per kernel call
+
+
+Kernel = Callable[[NDArray, NDArray], NDArray]
+
+
+def euclidean(cities: NDArray, a: NDArray, b: NDArray) -> NDArray:
+    """Euclidean distances between cities a[i] and b[i] (index arrays are broadcast together).
+
+    Args:
+        cities (NDArray): cities as [[x1, y1, ...], ...]
+        a (NDArray): indices of first cities
+        b (NDArray): indices of second cities
+
+    Returns:
+        NDArray: distances
+    """
+    diff = cities[a] - cities[b]
+    return np.sqrt(np.einsum('...i,...i->...', diff, diff))
+
+
+def condensed_size(n: int) -> int:
+    """Number of entries in the condensed form of an n x n distance matrix.
+
+    Args:
+        n (int): number of cities
+
+    Returns:
+        int: size
+    """
+    return n * (n - 1) // 2
+
+
+def condensed_offset(n: int, a: int) -> int:
+    """Position in the condensed form at which the row for city a (edges to all b > a) begins.
+
+    Args:
+        n (int): number of cities
+        a (int): city index
+
+    Returns:
+        int: offset
+    """
+    return a * n - a * (a + 1) // 2
+
+
+def _row_blocks(n: int, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    start = 0
+    while start < n - 1:
+        stop = start + 1
+        count = n - 1 - start
+        while stop < n - 1 and count + (n - 1 - stop) <= chunk_size:
+            count += n - 1 - stop
+            stop += 1
+        yield start, stop
+        start = stop
+
+
+def _block_pairs(n: int, start: int, stop: int) -> Tuple[NDArray, NDArray]:
+    rows = np.arange(start, stop)
+    counts = n - 1 - rows
+    firsts = np.cumsum(counts) - counts
+    a = np.repeat(rows, counts)
+    b = np.arange(counts.sum()) - np.repeat(firsts - rows - 1, counts)
+    return a, b
+
+
+def upper_triangle_blocks(n: int, chunk_size: int = None) -> Iterator[Tuple[NDArray, NDArray]]:
+    """Produces the index pairs (a, b) with a < b in blocks of at most `chunk_size` pairs (or a
+    single row of the matrix, if that is longer), in the same order as the condensed form.
+
+    Args:
+        n (int): number of cities
+        chunk_size (int, optional): Maximum number of pairs per block. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Yields:
+        Iterator[Tuple[NDArray, NDArray]]: indices of first and second cities
+    """
+    if chunk_size is None:
+        chunk_size = DEFAULT_CHUNK_SIZE
+    for start, stop in _row_blocks(n, chunk_size):
+        yield _block_pairs(n, start, stop)
+
+
+def edge_matrix(kernel: Kernel, n: int, dtype: DTypeLike = np.float32, condensed: bool = False,
+                chunk_size: int = None) -> NDArray:
+    """Generate a symmetric edge matrix by evaluating a kernel over the upper triangle.
+
+    Args:
+        kernel (Kernel): edge kernel, `kernel(a, b)` giving the edge lengths between a[i] and b[i]
+        n (int): number of cities
+        dtype (DTypeLike, optional): Data type of the result. Defaults to np.float32.
+        condensed (bool, optional): Whether to produce the condensed form. Defaults to False.
+        chunk_size (int, optional): Maximum number of edges per kernel call. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Returns:
+        NDArray: edge matrix (n x n) or condensed edge matrix (n * (n - 1) / 2)
+    """
+    if condensed:
+        result = np.empty(condensed_size(n), dtype=dtype)
+    else:
+        result = np.zeros((n, n), dtype=dtype)
+    offset = 0
+    for a, b in upper_triangle_blocks(n, chunk_size):
+        d = kernel(a, b)
+        if condensed:
+            result[offset:offset + len(d)] = d
+            offset += len(d)
+        else:
+            result[a, b] = d
+            result[b, a] = d
+    return result
+
+
+def condense(square: NDArray, dtype: DTypeLike = None) -> NDArray:
+    """Convert a symmetric edge matrix from square form to condensed form.
+
+    Args:
+        square (NDArray): edge matrix (n x n)
+        dtype (DTypeLike, optional): Data type of the result. Defaults to that of the square form.
+
+    Returns:
+        NDArray: condensed edge matrix
+    """
+    n = square.shape[0]
+    result = np.empty(condensed_size(n), dtype=square.dtype if dtype is None else dtype)
+    for a in range(n - 1):
+        offset = condensed_offset(n, a)
+        result[offset:offset + n - 1 - a] = square[a, a + 1:]
+    return result
+
+
+def expand(condensed: NDArray, dtype: DTypeLike = None) -> NDArray:
+    """Convert a symmetric edge matrix from condensed form to square form.
+
+    Args:
+        condensed (NDArray): condensed edge matrix
+        dtype (DTypeLike, optional): Data type of the result. Defaults to that of the condensed form.
+
+    Returns:
+        NDArray: edge matrix (n x n)
+    """
+    n = int(round((1 + np.sqrt(1 + 8 * len(condensed))) / 2))
+    result = np.zeros((n, n), dtype=condensed.dtype if dtype is None else dtype)
+    for a in range(n - 1):
+        offset = condensed_offset(n, a)
+        row = condensed[offset:offset + n - 1 - a]
+        result[a, a + 1:] = row
+        result[a + 1:, a] = row
+    return result
+
+
+class EdgeCache:
+    """Lazily-built, version-checked store of the edge matrices of a single problem."""
+
+    def __init__(self, max_bytes: int = None):
+        """
+        Args:
+            max_bytes (int, optional): Memory cap for stored matrices. Defaults to None (no cap).
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._matrices: Dict[Tuple[str, bool], NDArray] = {}
+
+    @property
+    def nbytes(self) -> int:
+        """Memory taken up by stored matrices.
+
+        Returns:
+            int: bytes
+        """
+        return sum(m.nbytes for m in self._matrices.values())
+
+    def clear(self):
+        """Drop all stored matrices."""
+        self._matrices = {}
+
+    def peek(self, version: int, dtype: DTypeLike = np.float32, condensed: bool = False) -> NDArray:
+        """Look up a stored matrix without building one (and without touching the counters).
+
+        Args:
+            version (int): version of the problem
+            dtype (DTypeLike, optional): Data type of the matrix. Defaults to np.float32.
+            condensed (bool, optional): Whether the matrix is in condensed form. Defaults to False.
+
+        Returns:
+            NDArray: matrix, or None if it is not stored
+        """
+        if version != self._version:
+            return None
+        return self._matrices.get((np.dtype(dtype).str, condensed))
+
+    def get(self, version: int, build: Callable[[], NDArray], dtype: DTypeLike = np.float32,
+            condensed: bool = False) -> NDArray:
+        """Look up a matrix, deriving it from a stored one or building it if necessary.
+
+        Args:
+            version (int): version of the problem (anything stored for another version is dropped)
+            build (Callable[[], NDArray]): procedure generating an edge matrix from scratch; it may
+                produce any dtype or form, which is stored as well
+            dtype (DTypeLike, optional): Data type of the matrix. Defaults to np.float32.
+            condensed (bool, optional): Whether the matrix is in condensed form. Defaults to False.
+
+        Returns:
+            NDArray: matrix (read-only)
+        """
+        if version != self._version:
+            self.clear()
+            self._version = version
+        key = (np.dtype(dtype).str, condensed)
+        if key in self._matrices:
+            self.hits += 1
+            return self._matrices[key]
+        self.misses += 1
+        source = self._find_source(key)
+        if source is None:
+            built = build()
+            source = (built.dtype.str, built.ndim == 1)
+            self._store(source, built)
+        result = self._derive(self._matrices[source], key)
+        self._store(key, result)
+        self._enforce_cap(key)
+        return result
+
+    def _find_source(self, key: Tuple[str, bool]) -> Tuple[str, bool]:
+        # Only derive from matrices at least as precise as the one requested, preferring same form
+        candidates = [k for k in self._matrices if np.can_cast(np.dtype(key[0]), np.dtype(k[0]))]
+        candidates.sort(key=lambda k: k[1] != key[1])
+        return candidates[0] if candidates else None
+
+    @staticmethod
+    def _derive(source: NDArray, key: Tuple[str, bool]) -> NDArray:
+        dtype, condensed = np.dtype(key[0]), key[1]
+        if condensed == (source.ndim == 1):
+            return source if source.dtype == dtype else source.astype(dtype)
+        if condensed:
+            return condense(source, dtype)
+        return expand(source, dtype)
+
+    def _store(self, key: Tuple[str, bool], matrix: NDArray):
+        matrix.flags.writeable = False
+        self._matrices[key] = matrix
+
+    def _enforce_cap(self, keep: Tuple[str, bool]):
+        if self.max_bytes is None:
+            return
+        squares = sorted((k for k in self._matrices if not k[1]), key=lambda k: -self._matrices[k].nbytes)
+        for k in squares:
+            if self.nbytes <= self.max_bytes:
+                return
+            if not any(c and np.can_cast(np.dtype(k[0]), np.dtype(d)) for d, c in self._matrices):
+                self._store((k[0], True), condense(self._matrices[k]))
+            del self._matrices[k]
+        for k in sorted(self._matrices, key=lambda k: (k == keep, -self._matrices[k].nbytes)):
+            if self.nbytes <= self.max_bytes:
+                return
+            del self._matrices[k]
@@ -0,0 +1,422 @@
+"""Improves tours by local search, using 2-opt and Or-opt moves. The procedures of this module are
+wrapped by `tsp.core.solvers.two_opt_solve`, which can be used either as a solver in its own right or
+to post-process the tours of any other solver (such as `tsp.core.solvers.pyramid_solve`).
+
+A 2-opt move removes two edges of the tour and reconnects the two resulting paths the other way
+around (reversing one of them). An Or-opt move takes a segment of up to three consecutive cities out
+of the tour and inserts it (either way around) between two other adjacent cities. `local_search`
+repeatedly makes whichever improving move it finds first, until no improving move is left (a local
+optimum) or its time or iteration budget runs out.
+
+The search is kept fast on large problems by two standard devices. First, only moves which connect a
+city to one of its nearest neighbors are considered (the neighbor lists are found with a KD-tree, or
+from the edge matrix of a non-Euclidean problem). Second, each city has a "don't look bit": cities
+are taken from a queue, and a city only goes back in the queue once one of its edges has changed,
+since otherwise the moves around it have already been tried. The tour itself is kept as an array
+with the position of each city, and a 2-opt move reverses whichever side of the tour is shorter.
+
+Edge lengths come from the coordinates of the cities for Euclidean problems, and from the cached
+edge matrix (see `tsp.core.tsp.N_TSP.to_edge_matrix`) otherwise, so that local search works for any
+kind of TSP, such as `tsp.extra.obstacles.TSP_O`.
+
+`iterated_local_search` goes beyond a single local optimum by repeatedly kicking the tour out of it
+with a random double bridge move and searching again (as in the chained Lin-Kernighan heuristic,
+though with 2-opt and Or-opt as the local search). It is wrapped by `tsp.core.solvers.ils_solve`.
+"""
+
+
+from collections import deque
+import math
+import time
+from typing import Callable, Iterable, Iterator, List, Tuple, Union
+
+from numpy.typing import NDArray
+import numpy.random as random
+import numpy as np
+from scipy.spatial import cKDTree
+
+from tsp.core.tsp import N_TSP
+
+
+EPSILON = 1e-9  # smallest improvement worth making, so that rounding errors can't cause cycling
+
+
+def _edge_lookup(tsp: N_TSP) -> Callable[[int, int], float]:
+    if tsp.euclidean:
+        points = tsp.cities.astype(np.float64).tolist()
+        return lambda a, b: math.dist(points[a], points[b])
+    return tsp.to_edge_matrix(np.float64).item
+
+
+def neighbor_lists(tsp: N_TSP, k: int = 10) -> List[List[int]]:
+    """Find the k nearest neighbors of each city, in order of increasing distance.
+
+    Args:
+        tsp (N_TSP): TSP
+        k (int, optional): Number of neighbors. Defaults to 10.
+
+    Returns:
+        List[List[int]]: neighbors of each city
+    """
+    n = tsp.cities.shape[0]
+    k = min(k, n - 1)
+    if k <= 0:
+        return [[] for _ in range(n)]
+    if tsp.euclidean:
+        _, candidates = cKDTree(tsp.cities).query(tsp.cities, k=k + 1)
+    else:
+        E = tsp.to_edge_matrix(np.float64)
+        candidates = np.argpartition(E, k, axis=1)[:, :k + 1]
+        rows = np.arange(n)[:, None]
+        candidates = candidates[rows, np.argsort(E[rows, candidates], axis=1, kind='stable')]
+    result = []
+    for i, row in enumerate(candidates.tolist()):
+        if i in row:
+            row.remove(i)
+        result.append(row[:k])
+    return result
+
+
+def _reverse(order: List[int], pos: List[int], i: int, j: int, length: int):
+    # Reverse the cities at positions i, i + 1, ..., j (wrapping around the end), length in all
+    n = len(order)
+    for _ in range(length // 2):
+        a, b = order[i], order[j]
+        order[i], order[j] = b, a
+        pos[a], pos[b] = j, i
+        i = i + 1 if i + 1 < n else 0
+        j = j - 1 if j else n - 1
+
+
+def _positions(order: List[int]) -> List[int]:
+    pos = [0] * len(order)
+    for i, city in enumerate(order):
+        pos[city] = i
+    return pos
+
+
+def _tour_length(order: List[int], dist: Callable[[int, int], float]) -> float:
+    return sum(dist(a, b) for a, b in zip(order, order[1:] + order[:1]))
+
+
+def _local_search(order: List[int], pos: List[int], dist: Callable[[int, int], float], near: List[List[int]],
+                  or_opt: int, queue: Iterable[int], deadline: float = None, max_iterations: int = None,
+                  journal: List[Tuple[int, int, int]] = None, stop: Callable[[], bool] = None) -> Tuple[int, float]:
+    """Make improving moves in place, starting from the cities in the queue, until no improving move
+    is left or the budget runs out (or stop returns True). Each reversal made is appended to the
+    journal (if given), so that the moves can be undone with `_undo`. Returns the number of moves made
+    and the total gain."""
+    n = len(order)
+
+    def succ(city):
+        return order[pos[city] + 1 - n]
+
+    def pred(city):
+        return order[pos[city] - 1]
+
+    def reverse(first, last):
+        # Reverse the path from first forward to last (or equivalently, the rest of the tour)
+        i, j = pos[first], pos[last]
+        length = (j - i) % n + 1
+        if 2 * length > n:
+            i, j, length = (j + 1) % n, (i - 1) % n, n - length
+        _reverse(order, pos, i, j, length)
+        if journal is not None:
+            journal.append((i, j, length))
+
+    def swap(a, b, c, d):
+        # Replace the edges (a, b) and (c, d) with (a, c) and (b, d), where b follows a if and only if
+        # d follows c
+        if succ(a) == b:
+            reverse(b, c)
+        else:
+            reverse(c, b)
+
+    def try_two_opt(a):
+        for forward in (True, False):
+            b = succ(a) if forward else pred(a)
+            d_ab = dist(a, b)
+            for c in near[a]:
+                gain = d_ab - dist(a, c)
+                if gain <= EPSILON:
+                    break
+                d = succ(c) if forward else pred(c)
+                if c == b or d == a:
+                    continue
+                gain += dist(c, d) - dist(b, d)
+                if gain > EPSILON:
+                    if forward:
+                        swap(a, b, c, d)
+                    else:
+                        swap(b, a, d, c)
+                    return [a, b, c, d], gain
+        return None, 0.
+
+    def try_or_opt(a):
+        segment = []
+        for length in range(1, or_opt + 1):
+            if n < length + 4:
+                break
+            s2 = succ(segment[-1]) if segment else a
+            segment.append(s2)
+            p, q = pred(a), succ(s2)
+            removal = dist(p, a) + dist(s2, q) - dist(p, q)
+            if removal <= EPSILON:
+                continue
+            for x, y in ((a, s2), (s2, a)) if length > 1 else ((a, a),):
+                for c in near[x]:
+                    d_xc = dist(x, c)
+                    if d_xc >= removal - EPSILON:
+                        break
+                    if c in segment:
+                        continue
+                    for d in (succ(c), pred(c)):
+                        if d in segment:
+                            continue
+                        gain = removal - d_xc - dist(y, d) + dist(c, d)
+                        if gain > EPSILON:
+                            insert(a, s2, p, q, c, d, x)
+                            return [p, q, c, d, a, s2], gain
+        return None, 0.
+
+    def insert(s1, s2, p, q, c, d, x):
+        # Move the segment s1...s2 (between p and q) in between c and d, with x next to c
+        if succ(c) != d:
+            c, d, x = d, c, (s2 if x == s1 else s1)
+        swap(p, s1, c, d)
+        swap(p, c, q, s2)
+        if x != s2:
+            swap(c, s2, s1, d)
+
+    queue = deque(queue)
+    queued = [False] * n
+    for city in queue:
+        queued[city] = True
+    moves, total = 0, 0.
+    while queue:
+        if max_iterations is not None and moves >= max_iterations:
+            break
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+        if stop is not None and stop():
+            break
+        a = queue.popleft()
+        queued[a] = False
+        touched, gain = try_two_opt(a)
+        if touched is None and or_opt > 0:
+            touched, gain = try_or_opt(a)
+        if touched is not None:
+            moves += 1
+            total += gain
+            for city in touched:
+                if not queued[city]:
+                    queued[city] = True
+                    queue.append(city)
+    return moves, total
+
+
+def _undo(order: List[int], pos: List[int], journal: List[Tuple[int, int, int]]):
+    while journal:
+        _reverse(order, pos, *journal.pop())
+
+
+def _double_bridge(order: List[int], pos: List[int], dist: Callable[[int, int], float], rng: random.Generator,
+                   window: int) -> Tuple[List[int], float, Tuple[int, List[int]]]:
+    """Kick the tour with a double bridge move A B C D -> A C B D, where B and C are adjacent segments
+    (starting at a random position) at most `window` cities long in all. Returns the cities whose
+    edges changed, the change in length, and what is needed to undo the kick with `_undo_kick`."""
+    n = len(order)
+    start = int(rng.integers(n))
+    o1, o2, o3 = sorted(rng.choice(np.arange(1, min(window, n - 2) + 1), 3, replace=False).tolist())
+    positions = [(start + k) % n for k in range(o1, o3 + 1)]
+    old = [order[k] for k in positions[:-1]]
+    a, b, c = order[(start + o1 - 1) % n], old[o2 - o1 - 1], order[positions[-1]]
+    d, e = old[0], old[-1]
+    f = old[o2 - o1]
+    new = old[o2 - o1:] + old[:o2 - o1]
+    for k, city in zip(positions, new):
+        order[k] = city
+        pos[city] = k
+    delta = dist(a, f) + dist(e, d) + dist(b, c) - dist(a, d) - dist(b, f) - dist(e, c)
+    return [a, b, c, d, e, f], delta, (positions[0], old)
+
+
+def _undo_kick(order: List[int], pos: List[int], kick: Tuple[int, List[int]]):
+    start, old = kick
+    n = len(order)
+    for k, city in enumerate(old):
+        order[(start + k) % n] = city
+        pos[city] = (start + k) % n
+
+
+def local_search_anytime(tsp: N_TSP, tour: NDArray, stop: Callable[[], bool] = None, neighbors: int = 10,
+                         or_opt: int = 3, time_limit: float = None, max_iterations: int = None) -> Iterator[NDArray]:
+    """Anytime version of `local_search` (see `tsp.core.anytime`): produces the starting tour, and then
+    the improved tour once it is locally optimal, the budget runs out, or stop returns True.
+
+    Args:
+        tsp (N_TSP): TSP which the tour solves
+        tour (NDArray): tour as vertex indices
+        stop (Callable[[], bool], optional): Procedure returning True once the search should stop.
+            Defaults to None.
+        neighbors (int, optional): Number of nearest neighbors considered for each city. Defaults to 10.
+        or_opt (int, optional): Longest segment moved by Or-opt moves (0 for 2-opt alone). Defaults to 3.
+        time_limit (float, optional): Time budget, in seconds. Defaults to None (no limit).
+        max_iterations (int, optional): Maximum number of moves to make. Defaults to None (no limit).
+
+    Yields:
+        Iterator[NDArray]: tours as vertex indices
+    """
+    order = [int(i) for i in tour]
+    yield np.array(order)
+    if len(order) < 5:
+        return
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    moves, _ = _local_search(order, _positions(order), _edge_lookup(tsp), neighbor_lists(tsp, neighbors), or_opt,
+                             order, deadline, max_iterations, stop=stop)
+    if moves:
+        yield np.array(order)
+
+
+def local_search(tsp: N_TSP, tour: NDArray, neighbors: int = 10, or_opt: int = 3, time_limit: float = None,
+                 max_iterations: int = None) -> NDArray:
+    """Improve a tour with 2-opt and Or-opt moves, until it is locally optimal or the budget runs out.
+
+    Args:
+        tsp (N_TSP): TSP which the tour solves
+        tour (NDArray): tour as vertex indices
+        neighbors (int, optional): Number of nearest neighbors considered for each city. Defaults to 10.
+        or_opt (int, optional): Longest segment moved by Or-opt moves (0 for 2-opt alone). Defaults to 3.
+        time_limit (float, optional): Time budget, in seconds. Defaults to None (no limit).
+        max_iterations (int, optional): Maximum number of moves to make. Defaults to None (no limit).
+
+    Returns:
+        NDArray: improved tour as vertex indices
+    """
+    for result in local_search_anytime(tsp, tour, None, neighbors, or_opt, time_limit, max_iterations):
+        pass
+    return result
+
+
+def iterated_local_search_anytime(tsp: N_TSP, tour: NDArray, stop: Callable[[], bool] = None, kicks: int = None,
+                                  restarts: int = 1, time_limit: float = None,
+                                  seed: Union[int, random.SeedSequence] = None, neighbors: int = 10,
+                                  or_opt: int = 3, window: int = 50, interval: float = 0.1) -> Iterator[NDArray]:
+    """Anytime version of `iterated_local_search` (see `tsp.core.anytime`): produces the starting tour,
+    the locally optimal tour it leads to, and then each new best tour, at most once every `interval`
+    seconds while a run is going on, and at the end of each run which found one. The last tour produced
+    is the result of `iterated_local_search`.
+
+    Args:
+        tsp (N_TSP): TSP which the tour solves
+        tour (NDArray): tour as vertex indices
+        stop (Callable[[], bool], optional): Procedure returning True once the search should stop.
+            Defaults to None.
+        kicks (int, optional): Number of kicks per restart. Defaults to None (as many as there are
+            cities, or until the time limit if there is one).
+        restarts (int, optional): Number of independent runs. Defaults to 1.
+        time_limit (float, optional): Time budget for all of the runs together (split evenly between them), in seconds. Defaults to None (no limit).
+        seed (Union[int, random.SeedSequence], optional): Seed for the random kicks. Defaults to None.
+        neighbors (int, optional): Number of nearest neighbors considered for each city. Defaults to 10.
+        or_opt (int, optional): Longest segment moved by Or-opt moves (0 for 2-opt alone). Defaults to 3.
+        window (int, optional): Largest number of cities moved by a kick (at least 3). Defaults to 50.
+        interval (float, optional): Shortest time between tours produced during a run, in seconds.
+            Defaults to 0.1.
+
+    Raises:
+        ValueError: if window is less than 3
+
+    Yields:
+        Iterator[NDArray]: tours as vertex indices
+    """
+    if window < 3:
+        raise ValueError(f'window must be at least 3, not {window}')
+    initial = [int(i) for i in tour]
+    n = len(initial)
+    if n < 8:
+        yield from local_search_anytime(tsp, tour, stop, neighbors, or_opt, time_limit)
+        return
+    yield np.array(initial)
+    if kicks is None and time_limit is None:
+        kicks = n
+    rng = random.default_rng(seed)
+    started = time.perf_counter()
+    dist = _edge_lookup(tsp)
+    near = neighbor_lists(tsp, neighbors)
+
+    best_length = np.inf
+    for restart in range(restarts):
+        # Each run gets an equal share of whatever time is left
+        deadline = None
+        if time_limit is not None:
+            now = time.perf_counter()
+            deadline = now + (started + time_limit - now) / (restarts - restart)
+        order = initial[:]
+        pos = _positions(order)
+        _local_search(order, pos, dist, near, or_opt, order, deadline, stop=stop)
+        length = _tour_length(order, dist)
+        reported = length < best_length
+        if reported:
+            yield np.array(order)
+            best_length = length
+        last_report = time.perf_counter()
+        journal = []
+        kick = 0
+        while kicks is None or kick < kicks:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            if stop is not None and stop():
+                break
+            kick += 1
+            touched, delta, undo = _double_bridge(order, pos, dist, rng, window)
+            _, gain = _local_search(order, pos, dist, near, or_opt, touched, deadline, journal=journal, stop=stop)
+            if delta - gain > 0.:
+                _undo(order, pos, journal)
+                _undo_kick(order, pos, undo)
+            elif gain - delta > EPSILON:
+                length += delta - gain
+                if length < best_length and time.perf_counter() - last_report >= interval:
+                    yield np.array(order)
+                    best_length, reported, last_report = length, True, time.perf_counter()
+            journal.clear()
+        length = _tour_length(order, dist)
+        if length < best_length or reported:
+            yield np.array(order)
+            best_length = length
+
+
+def iterated_local_search(tsp: N_TSP, tour: NDArray, kicks: int = None, restarts: int = 1, time_limit: float = None,
+                          seed: Union[int, random.SeedSequence] = None, neighbors: int = 10, or_opt: int = 3,
+                          window: int = 50) -> NDArray:
+    """Improve a tour by iterated (chained) local search: starting from a locally optimal tour, kick it
+    with a random double bridge move (which 2-opt and Or-opt moves cannot undo), make it locally
+    optimal again, and keep the result if it is no longer than before.
+
+    The kicks are kept local (the segments swapped are at most `window` cities long in all), so only
+    the cities around a kick need to be searched again, and a kick which doesn't pay off is undone
+    rather than copying the whole tour, so each kick takes about constant time, no matter how large the
+    problem. With restarts, the search is run several times from the same tour with different kicks,
+    and the best result is kept.
+
+    Args:
+        tsp (N_TSP): TSP which the tour solves
+        tour (NDArray): tour as vertex indices
+        kicks (int, optional): Number of kicks per restart. Defaults to None (as many as there are
+            cities, or until the time limit if there is one).
+        restarts (int, optional): Number of independent runs. Defaults to 1.
+        time_limit (float, optional): Time budget for all of the runs together (split evenly between them), in seconds. Defaults to None (no limit).
+        seed (Union[int, random.SeedSequence], optional): Seed for the random kicks. Defaults to None.
+        neighbors (int, optional): Number of nearest neighbors considered for each city. Defaults to 10.
+        or_opt (int, optional): Longest segment moved by Or-opt moves (0 for 2-opt alone). Defaults to 3.
+        window (int, optional): Largest number of cities moved by a kick (at least 3). Defaults to 50.
+
+    Raises:
+        ValueError: if window is less than 3
+
+    Returns:
+        NDArray: improved tour as vertex indices
+    """
+    for result in iterated_local_search_anytime(tsp, tour, None, kicks, restarts, time_limit, seed, neighbors, or_opt,
+                                                window, np.inf):
+        pass
+    return result
@@ -6,74 +6,260 @@ This code is a replication and improvement of the "graph pyramid" described in [
 algorithm is described in detail in a paper by J. VanDrunen, K. Nam, M. A. Beers, and Z. Pizlo,
 currently in preparation.
 
+Each level of the pyramid is clustered by joining every vertex to its nearest neighbor (a single
+step of Borůvka's algorithm). By default the nearest neighbors are found with a dense distance
+matrix, which limits the problem size by memory alone; pass `sparse=True` to `pyramid_solve` to find
+them with a KD-tree instead, in O(n log n) time and O(n) memory, with identical results.
+
+The levels are then refined from the top down, each subcluster being solved as a short path between
+its neighbors. Pass `workers` to `pyramid_solve` to refine the subclusters of each level in a pool of
+processes. With `s=1` this gives the same tour as refining them in order; with larger `s` the
+subclusters are chained together, and `approximate=True` must be passed to refine them independently.
+
+`pyramid_solve_batch` solves many problems at once, reusing its scratch space (distance matrix buffers
+and dynamic programming tables) from one problem to the next, and optionally spreading the problems
+over a pool of processes.
+
+`pyramid_trace` runs the same algorithm step by step, yielding the tour of each level of the pyramid
+from the top down, along with the time spent clustering and refining that level. This is useful for
+profiling large instances, and for visualizing the coarse-to-fine process.
+
 [1] Haxhimusa, Y., Kropatsch, W. G., Pizlo, Z., & Ion, A. (2009). Approximate graph pyramid
 solution of the E-TSP.
 """
 
 
-from typing import List
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Tuple
 from collections import defaultdict
-import itertools as it
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+import time
 
 from numpy.typing import NDArray
 import numpy as np
+from scipy.spatial import cKDTree
 
+from tsp.core.distances import DEFAULT_CHUNK_SIZE
 from tsp.core.tsp import N_TSP
 from tsp.core.tree_split import do_split
 
 
-def _cheapest_insertion(centroids, nodes, prev_centroid, next_centroid):
-    min_distance = float('inf')
-    result = None
-    for partial_tour in it.permutations(nodes):
-        if prev_centroid is not None:
-            partial_tour_centroids = [prev_centroid] + [centroids[i] for i in partial_tour] + [next_centroid]
-        else:
-            partial_tour_centroids = [centroids[i] for i in partial_tour]
-            partial_tour_centroids.append(partial_tour_centroids[0])  # make closed tour!
-        distance = 0.
-        for i in range(1, len(partial_tour_centroids)):
-            distance += np.sqrt(np.sum(np.square(partial_tour_centroids[i] - partial_tour_centroids[i - 1])))
-        if distance < min_distance:
-            min_distance = distance
-            result = partial_tour
+def _path_lengths(points: NDArray, ends: NDArray) -> NDArray:
+    diff = points[:, None, :] - ends[None, :, :]
+    return np.sqrt(np.sum(np.square(diff), axis=-1))
+
+
+class _Workspace:
+    """Scratch space reused from one level of the pyramid to the next, and from one problem to the
+    next when solving in batches: a buffer for the distance matrices of the clustering, and the
+    layout and table of the Held-Karp program for each subproblem size."""
+
+    def __init__(self):
+        self._distances = np.empty(0, dtype=np.float64)
+        self._held_karp = {}
+
+    def distances(self, n: int) -> NDArray:
+        if self._distances.size < n * n:
+            self._distances = np.empty(n * n, dtype=np.float64)
+        return self._distances[:n * n].reshape(n, n)
+
+    def held_karp(self, m: int) -> Tuple:
+        if m not in self._held_karp:
+            full = (1 << m) - 1
+            bits = 1 << np.arange(m)
+            masks = np.arange(full + 1)
+            visited = (masks[:, None] & bits) != 0
+            popcount = visited.sum(axis=1)
+            layers = []
+            for size in range(m - 1, 0, -1):
+                layer = masks[popcount == size]
+                layers.append((layer, layer[:, None] | bits, visited[layer]))
+            best = np.empty((full + 1, m), dtype=np.float64)
+            self._held_karp[m] = (np.arange(m), visited, layers, best)
+        return self._held_karp[m]
+
+
+def _held_karp(d: NDArray, last: NDArray, workspace: _Workspace = None) -> Tuple[NDArray, NDArray]:
+    """Held-Karp table for paths through all m nodes of the distance matrix d: best[mask, j] is the
+    length of the shortest way to finish from node j once the nodes in mask (which include j) have
+    been visited, where finishing from node j costs last[j]. Also returns which nodes each mask
+    contains, as a boolean array. The table belongs to the workspace, and is overwritten by the next
+    program of the same size."""
+    if workspace is None:
+        workspace = _Workspace()
+    nodes, visited, layers, best = workspace.held_karp(len(d))
+    best[-1] = last
+    for layer, following, blocked in layers:
+        following = best[following, nodes]
+        following[blocked] = np.inf
+        best[layer] = np.min(d[None, :, :] + following[:, None, :], axis=2)
+    return best, visited
+
+
+def _shortest_orders(d: NDArray, best: NDArray, first: NDArray = None, tol: float = 1e-9) -> Iterator[List[int]]:
+    """Every order of the nodes as long as the shortest path, up to rounding (a relative tolerance),
+    read off of a Held-Karp table by following only the steps which can still finish that short. The
+    path starts at node 0 if first is None, and otherwise costs first[j] to enter at j."""
+    m = len(d)
+    full = (1 << m) - 1
+    if first is None:
+        limit = best[1, 0]
+        stack = [([0], 1, 0.)]
+    else:
+        limit = np.min(first + best[1 << np.arange(m), np.arange(m)])
+        stack = [([j], 1 << j, first[j]) for j in range(m)]
+    limit += tol * max(abs(limit), 1.)
+    stack = [(order, mask, length) for order, mask, length in stack if length + best[mask, order[-1]] <= limit]
+    while stack:
+        order, mask, length = stack.pop()
+        if mask == full:
+            yield order
+            continue
+        j = order[-1]
+        for q in range(m):
+            if not mask >> q & 1 and length + d[j, q] + best[mask | 1 << q, q] <= limit:
+                stack.append((order + [q], mask | 1 << q, length + d[j, q]))
+
+
+def _permutation_length(points: List[NDArray]) -> float:
+    # Length of a path, added up edge by edge from its start, as the search over permutations did
+    length = 0.
+    for i in range(1, len(points)):
+        length += np.sqrt(np.sum(np.square(points[i] - points[i - 1])))
+    return length
+
+
+def _first_shortest(orders: Iterable[List[int]], length: Callable[[List[int]], float]) -> List[int]:
+    """The order the search over permutations would have chosen among orders of (practically) the
+    same length: the shortest as it added them up, ties going to the first in lexicographic order."""
+    result, shortest = None, np.inf
+    for order in sorted(map(tuple, orders)):
+        current = length(order)
+        if current < shortest:
+            result, shortest = list(order), current
     return result
 
 
+def _choose_path(d: NDArray, best: NDArray, points: NDArray, prev_point: NDArray, next_point: NDArray,
+                 first: NDArray) -> List[int]:
+    return _first_shortest(_shortest_orders(d, best, first),
+                           lambda order: _permutation_length([prev_point] + [points[j] for j in order] + [next_point]))
+
+
+def _choose_closed(d: NDArray, best: NDArray, points: NDArray) -> List[int]:
+    # The search over permutations tried every rotation of a closed tour, and these can add up to
+    # different lengths
+    orders = [order[i:] + order[:i] for order in _shortest_orders(d, best) for i in range(len(order))]
+    return _first_shortest(orders, lambda order: _permutation_length([points[j] for j in order + order[:1]]))
+
+
+def _cheapest_insertion(centroids, nodes, prev_centroid, next_centroid, workspace=None):
+    """Shortest ordering of the nodes, either as a path from prev_centroid to next_centroid or (if
+    prev_centroid is None) as a closed tour, found exactly with the Held-Karp dynamic program in
+    O(2^m m^2) time (rather than the O(m! m) of searching over permutations). Orders which tie, up to
+    rounding, are settled as the search over permutations settled them (see `_first_shortest`), since
+    the choice decides the refinements further down the pyramid.
+    """
+    if len(nodes) == 1:
+        return tuple(nodes)
+    points = np.array([centroids[i] for i in nodes], dtype=np.float64)
+    d = _path_lengths(points, points)
+    if prev_centroid is None:
+        # Every rotation of a closed tour is equally good, so search from (and back to) the first node
+        best, _ = _held_karp(d, d[:, 0], workspace)
+        order = _choose_closed(d, best, points)
+    else:
+        prev_point = np.asarray(prev_centroid, dtype=np.float64)
+        next_point = np.asarray(next_centroid, dtype=np.float64)
+        first = _path_lengths(prev_point[None, :], points)[0]
+        best, _ = _held_karp(d, _path_lengths(next_point[None, :], points)[0], workspace)
+        order = _choose_path(d, best, points, prev_point, next_point, first)
+    return tuple(nodes[j] for j in order)
+
+
+def _refine_paths(points: NDArray, prev_points: NDArray, next_point: NDArray,
+                  workspace: _Workspace = None) -> List[List[int]]:
+    """Shortest paths through the points from each of prev_points to next_point, as positions. The
+    Held-Karp table only depends on where the path ends, so it is built once for all of them."""
+    if len(points) == 1:
+        return [[0] for _ in prev_points]
+    d = _path_lengths(points, points)
+    best, _ = _held_karp(d, _path_lengths(next_point[None, :], points)[0], workspace)
+    return [_choose_path(d, best, points, prev_point, next_point, first)
+            for prev_point, first in zip(prev_points, _path_lengths(prev_points, points))]
+
+
 def _find_parent(i, parents):
     while parents[i] != i:
         i = parents[i]
     return i
 
 
-def _cluster_boruvka(nodes: List, k: int):
+def _distance_matrix(points: NDArray, out: NDArray = None) -> NDArray:
+    """Euclidean distance matrix (with infinite diagonal), computed a block of rows at a time."""
+    n = len(points)
+    result = np.empty((n, n), dtype=np.float64) if out is None else out
+    rows = max(1, DEFAULT_CHUNK_SIZE // max(1, n))
+    for start in range(0, n, rows):
+        diff = points[start:start + rows, None, :] - points[None, :, :]
+        result[start:start + rows] = np.sqrt(np.sum(np.square(diff), axis=-1))
+    np.fill_diagonal(result, np.inf)
+    return result
+
+
+def _nearest_neighbors(points: NDArray, k: int = 8) -> Tuple[NDArray, NDArray]:
+    """Nearest neighbor of each point (ties going to the lowest index) and the distance to it, found
+    with a KD-tree. Distances are recomputed exactly as in `_distance_matrix`, so the result is
+    identical to taking the argmin of each row of the dense matrix."""
+    n = len(points)
+    k = min(k, n)
+    tree = cKDTree(points)
+    farthest, candidates = tree.query(points, k=k)
+    exact = np.sqrt(np.sum(np.square(points[:, None, :] - points[candidates]), axis=-1))
+    exact[candidates == np.arange(n)[:, None]] = np.inf
+    weights = np.min(exact, axis=1)
+    nearest = np.min(np.where(exact == weights[:, None], candidates, n), axis=1)
+    if k < n:
+        # All k candidates tied (up to rounding), so there may be more ties further out
+        for i in np.flatnonzero(farthest[:, -1] <= weights * (1 + 1e-9)):
+            ball = np.array(sorted(tree.query_ball_point(points[i], weights[i] * (1 + 1e-9))))
+            d = np.sqrt(np.sum(np.square(points[i] - points[ball]), axis=-1))
+            d[ball == i] = np.inf
+            nearest[i] = ball[np.argmin(d)]
+            weights[i] = np.min(d)
+    return nearest, weights
+
+
+def _cluster_boruvka(nodes: List, k: int, sparse: bool = False, workspace: _Workspace = None,
+                     timings: List[float] = None):
     c = [nodes]
     v = []
     e = []
     while not v or len(v[-1]) > 1:
+        start = time.perf_counter()
         n = len(c[-1])
-        v.append(list(map(lambda i: [i], range(n))))
-
-        edges = np.zeros((n, n), dtype=np.float)
-        for i in range(n):
-            edges[i, i] = np.inf
-            for j in range(i + 1, n):
-                value = np.sqrt(np.sum(np.square(c[-1][i] - c[-1][j])))
-                edges[i, j] = value
-        i_lower = np.tril_indices(n, -1)
-        edges[i_lower] = edges.T[i_lower]
-
-        minimum_edges = {i : (np.inf, None, None) for i in range(n)}
-        for c1, c2 in it.combinations(range(n), 2):
-            for edge in it.product(v[-1][c1], v[-1][c2]):
-                if edges[edge] < minimum_edges[c1][0]:
-                    minimum_edges[c1] = edges[edge], edge, c2
-                if edges[edge] < minimum_edges[c2][0]:
-                    minimum_edges[c2] = edges[edge], edge, c1
+
+        # Every vertex starts out as its own component, so the minimum outgoing edge of each
+        # component is just the edge to its nearest neighbor (ties going to the lowest index)
+        if sparse:
+            # Only the nearest neighbor edges (which make up the clusters' trees) are ever looked
+            # up, so they are all the splitting procedure needs
+            nearest, weights = _nearest_neighbors(np.array(c[-1]))
+            edges = {}
+            for i, j, w in zip(range(n), nearest.tolist(), weights.tolist()):
+                edges[i, j] = edges[j, i] = w
+        else:
+            edges = _distance_matrix(np.array(c[-1]), None if workspace is None else workspace.distances(n))
+            nearest = np.argmin(edges, axis=1)
+            weights = edges[np.arange(n), nearest]
 
         parents = list(range(n))
         edge_tracker = defaultdict(set)
-        for c1, (_, edge, c2) in sorted(minimum_edges.items(), key=lambda t: t[1][0]):
+        nearest = nearest.tolist()
+        for c1 in np.argsort(weights, kind='stable').tolist():
+            c2 = nearest[c1]
+            edge = (c1, c2) if c1 < c2 else (c2, c1)
             c1_parent = _find_parent(c1, parents)
             c2_parent = _find_parent(c2, parents)
             if c1_parent != c2_parent:
@@ -91,7 +277,7 @@ def _cluster_boruvka(nodes: List, k: int):
                 del edge_tracker[i]
 
         c.append([])
-        v[-1] = []
+        v.append([])
         e.append([])
         for p in set(parents):
             if len(vertex_tracker[p]) > k:
@@ -112,46 +298,200 @@ def _cluster_boruvka(nodes: List, k: int):
                 v[-1].append(vertex_tracker[p])
                 e[-1].append(list(edge_tracker[p]))
 
+        if timings is not None:
+            timings.append(time.perf_counter() - start)
+
     return c, v, e
 
 
-def _solve_level(c, v, level, subcluster, prev_centroid=None, prev_centroids=None, next_centroid=None):
+def _solve_level(c, v, level, subcluster, prev_centroid=None, prev_centroids=None, next_centroid=None,
+                 workspace=None):
     if prev_centroids is None:
         prev_centroids = []
     centroids = c[level]
     nodes = v[level][subcluster] + prev_centroids
-    return _cheapest_insertion(centroids, nodes, prev_centroid, next_centroid)
+    return _cheapest_insertion(centroids, nodes, prev_centroid, next_centroid, workspace)
+
+
+def _refine_level(c, v, level, result, s, workspace):
+    new_result = []
+    for i, subcluster in enumerate(result):
+        if new_result:
+            prev_tour = new_result[-s:]
+            if len(prev_tour) > 1:
+                new_result = new_result[:-(len(prev_tour)-1)]
+            if i + 1 == len(result):
+                new_result.extend(_solve_level(c, v, level, subcluster, c[level][prev_tour[0]], prev_tour[1:], c[level][new_result[0]], workspace))
+            else:
+                new_result.extend(_solve_level(c, v, level, subcluster, c[level][prev_tour[0]], prev_tour[1:], c[level + 1][result[(i + 1) % len(result)]], workspace))
+        else:
+            new_result.extend(_solve_level(c, v, level, subcluster, prev_centroid=c[level + 1][result[i - 1]], next_centroid=c[level + 1][result[(i + 1) % len(result)]], workspace=workspace))
+    return new_result
+
+
+def _refine_task(task):
+    return _refine_paths(*task)
 
 
-def pyramid_solve(tsp: N_TSP, k: int = 6, s: int = 1) -> NDArray:
+def _map_tasks(tasks, executor, workers, workspace):
+    if executor is None:
+        return [_refine_paths(*task, workspace) for task in tasks]
+    return list(executor.map(_refine_task, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+
+
+def _refine_level_parallel(c, v, level, result, executor, workers, approximate, workspace):
+    points = [np.array([c[level][i] for i in v[level][subcluster]]) for subcluster in result]
+
+    def task(i, prev_points=None, next_point=None):
+        if prev_points is None:
+            prev_points = c[level + 1][result[i - 1]][None, :]
+        if next_point is None:
+            next_point = c[level + 1][result[(i + 1) % len(result)]]
+        return points[i], prev_points, next_point
+
+    if approximate:
+        # Each subcluster goes between the centroids of its neighbors, like the first one does
+        paths = _map_tasks([task(i) for i in range(len(result))], executor, workers, workspace)
+        return [v[level][subcluster][j] for subcluster, (path,) in zip(result, paths) for j in path]
+
+    # With s = 1, a subcluster's path depends on the rest of the level only through the city it
+    # comes from, which is one of the cities of the previous subcluster, so solve for all of them
+    first, = _refine_paths(*task(0), workspace)
+    new_result = [v[level][result[0]][j] for j in first]
+    tasks = [task(i, points[i - 1]) for i in range(1, len(result) - 1)]
+    if len(result) > 1:
+        tasks.append(task(len(result) - 1, points[-2], c[level][new_result[0]]))
+    for i, paths in enumerate(_map_tasks(tasks, executor, workers, workspace), 1):
+        path = paths[v[level][result[i - 1]].index(new_result[-1])]
+        new_result.extend(v[level][result[i]][j] for j in path)
+    return new_result
+
+
+class PyramidLevel(NamedTuple):
+    """A level of the pyramid, as produced by `pyramid_trace`.
+
+    Attributes:
+        level (int): level of the pyramid, counting up from the cities at level 0
+        tour (NDArray): tour of the level, as indices of its centroids
+        centroids (NDArray): centroids of the clusters making up the level (the cities at level 0)
+        subproblems (int): number of subproblems solved to produce the tour
+        cluster_seconds (float): time spent clustering the level to produce the one above it
+        solve_seconds (float): time spent producing the tour
+    """
+    level: int
+    tour: NDArray
+    centroids: NDArray
+    subproblems: int
+    cluster_seconds: float
+    solve_seconds: float
+
+
+def _check_workers(s, workers, approximate):
+    if workers is not None and s > 1 and not approximate:
+        raise ValueError('parallel refinement is only exact for s = 1; pass approximate=True to refine '
+                         'subclusters independently')
+
+
+def _pyramid_levels(cities, k, s, sparse, workers, approximate, workspace) -> Iterator[PyramidLevel]:
+    nodes = list(map(lambda a: np.array(a, dtype=np.float64), cities))
+    timings = []
+    c, v, _ = _cluster_boruvka(nodes, k, sparse, workspace, timings)
+    level = len(v) - 1
+    start = time.perf_counter()
+    result = _solve_level(c, v, level, 0, workspace=workspace)
+    elapsed = time.perf_counter() - start
+    yield PyramidLevel(level, np.array(result), np.array(c[level]), 1, timings[level], elapsed)
+    with ProcessPoolExecutor(workers) if workers is not None else nullcontext() as executor:
+        while level > 0:
+            level -= 1
+            start = time.perf_counter()
+            subproblems = len(result)
+            if executor is None and not approximate:
+                result = _refine_level(c, v, level, result, s, workspace)
+            else:
+                result = _refine_level_parallel(c, v, level, result, executor, workers, approximate, workspace)
+            elapsed = time.perf_counter() - start
+            yield PyramidLevel(level, np.array(result), np.array(c[level]), subproblems, timings[level], elapsed)
+
+
+def _pyramid_solve(cities, k, s, sparse, workers, approximate, workspace):
+    for level in _pyramid_levels(cities, k, s, sparse, workers, approximate, workspace):
+        pass
+    assert len(level.tour) == len(cities)
+    return level.tour
+
+
+def _pyramid_solve_chunk(cities, k, s, sparse, workers, approximate):
+    workspace = _Workspace()
+    return [_pyramid_solve(x, k, s, sparse, workers, approximate, workspace) for x in cities]
+
+
+def pyramid_solve(tsp: N_TSP, k: int = 6, s: int = 1, sparse: bool = False, workers: int = None,
+                  approximate: bool = False) -> NDArray:
     """Find an approximately-optimal tour using hierarchical clustering algorithm.
 
     Args:
         nodes (N_TSP): TSP to solve
-        k (int, optional): Cluster size. Defaults to 6.
+        k (int, optional): Cluster size. Each subproblem is solved exactly in O(2^(k+s) (k+s)^2) time, so values up to about 12 are practical. Defaults to 6.
         s (int, optional): Number of previous cities to account for in partial tour (refines k+s-1 cities, where the extra 1 is the endpoint, for historical reasons). Defaults to 1.
+        sparse (bool, optional): Find the clustering edges with a KD-tree rather than a dense distance matrix at each level, taking O(n log n) time and O(n) memory instead of O(n^2). The result is the same. Defaults to False.
+        workers (int, optional): Number of processes to refine the subclusters of each level with. With s = 1 the result is the same as refining them one after another; with s > 1 the previous cities chain every subcluster to the one before it, so `approximate` must be set. Defaults to None (refine in this process, one after another).
+        approximate (bool, optional): Refine each subcluster independently, as a path between the centroids of its neighbors, ignoring s. Defaults to False.
 
     Returns:
         NDArray: tour
     """
-    nodes = list(map(lambda a: np.array(a, dtype=np.float64), tsp.cities))
-    c, v, _ = _cluster_boruvka(nodes, k)
-    level = len(v) - 1
-    result = _solve_level(c, v, level, 0)
-    while level > 0:
-        level -= 1
-        new_result = []
-        for i, subcluster in enumerate(result):
-            if new_result:
-                prev_tour = new_result[-s:]
-                if len(prev_tour) > 1:
-                    new_result = new_result[:-(len(prev_tour)-1)]
-                if i + 1 == len(result):
-                    new_result.extend(_solve_level(c, v, level, subcluster, c[level][prev_tour[0]], prev_tour[1:], c[level][new_result[0]]))
-                else:
-                    new_result.extend(_solve_level(c, v, level, subcluster, c[level][prev_tour[0]], prev_tour[1:], c[level + 1][result[(i + 1) % len(result)]]))
-            else:
-                new_result.extend(_solve_level(c, v, level, subcluster, prev_centroid=c[level + 1][result[i - 1]], next_centroid=c[level + 1][result[(i + 1) % len(result)]]))
-        result = new_result
-    assert len(result) == len(nodes)
-    return np.array(result)
+    _check_workers(s, workers, approximate)
+    return _pyramid_solve(tsp.cities, k, s, sparse, workers, approximate, _Workspace())
+
+
+def pyramid_trace(tsp: N_TSP, k: int = 6, s: int = 1, sparse: bool = False, workers: int = None,
+                  approximate: bool = False) -> Iterator[PyramidLevel]:
+    """Run `pyramid_solve` a level at a time, from the top of the pyramid down to the cities. Only
+    the pyramid itself and the tour of the current level are kept between levels, so tracing costs
+    little more than solving.
+
+    Args:
+        tsp (N_TSP): TSP to solve
+        k (int, optional): Cluster size. Defaults to 6.
+        s (int, optional): Number of previous cities to account for in partial tour. Defaults to 1.
+        sparse (bool, optional): Find the clustering edges with a KD-tree. Defaults to False.
+        workers (int, optional): Number of processes to refine the subclusters of each level with. Defaults to None.
+        approximate (bool, optional): Refine each subcluster independently. Defaults to False.
+
+    Returns:
+        Iterator[PyramidLevel]: levels of the pyramid, the last of which holds the tour of the cities
+    """
+    _check_workers(s, workers, approximate)
+    return _pyramid_levels(tsp.cities, k, s, sparse, workers, approximate, _Workspace())
+
+
+def pyramid_solve_batch(problems: List[N_TSP], k: int = 6, s: int = 1, sparse: bool = False,
+                        workers: int = None, approximate: bool = False, processes: int = None) -> List[NDArray]:
+    """Solve a batch of TSPs with `pyramid_solve`, reusing the same scratch space (distance matrix
+    buffers and dynamic programming tables) from one problem to the next.
+
+    Args:
+        problems (List[N_TSP]): TSPs to solve
+        k (int, optional): Cluster size. Defaults to 6.
+        s (int, optional): Number of previous cities to account for in partial tour. Defaults to 1.
+        sparse (bool, optional): Find the clustering edges with a KD-tree. Defaults to False.
+        workers (int, optional): Number of processes to refine the subclusters of each level of each
+            problem with, as in `pyramid_solve`. Defaults to None.
+        approximate (bool, optional): Refine each subcluster independently. Defaults to False.
+        processes (int, optional): Number of processes to spread the problems over (each problem is
+            solved by a single process, apart from its `workers`). Defaults to None (solve them all
+            in this process).
+
+    Returns:
+        List[NDArray]: tours, in the same order as the problems
+    """
+    cities = [p.cities for p in problems]
+    if processes is None:
+        return _pyramid_solve_chunk(cities, k, s, sparse, workers, approximate)
+    size = max(1, -(-len(cities) // (4 * processes)))
+    chunks = [cities[i:i + size] for i in range(0, len(cities), size)]
+    with ProcessPoolExecutor(processes) as executor:
+        solve = partial(_pyramid_solve_chunk, k=k, s=s, sparse=sparse, workers=workers, approximate=approximate)
+        results = executor.map(solve, chunks)
+        return [tour for chunk in results for tour in chunk]
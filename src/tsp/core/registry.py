@@ -0,0 +1,149 @@
+"""Registry of solvers by name, with metadata describing what each solver can do.
+
+Solvers are registered under a name together with the location of their implementation, as a string
+of the form 'module:attribute'. The module is only imported the first time the solver is asked for,
+so that code which never solves anything (such as a worker which only scores tours) never pays for
+importing solver backends, and doesn't fail if one of them can't be used on its machine. This module
+itself only depends on the standard library.
+
+`get_solver` looks up a solver by name, and `tsp.core.tsp.N_TSP.solve` and
+`tsp.experiment.batch_solver.solve_batch` accept names as well as solver functions:
+
+```python
+tour = problem.solve('ils', time_limit=10)
+list_solvers(exact=True)  # ['concorde']
+```
+
+Each solver is described by a `SolverInfo`, which records whether the solver finds optimal tours
+(`exact`), whether it works on problems whose edge lengths are not the Euclidean distances between
+the cities (`non_metric`, e.g. `tsp.extra.obstacles.TSP_O` or `tsp.extra.color.TSP_Color`), and
+which external programs it requires. `list_solvers` filters solvers by these capabilities. New
+solvers (following the API of `tsp.core.solvers`) can be added with `register`.
+"""
+
+
+from importlib import import_module
+from typing import Callable, Dict, List, NamedTuple, Tuple, Union
+
+
+class SolverInfo(NamedTuple):
+    """A registered solver.
+
+    Attributes:
+        name (str): name of the solver
+        target (Union[str, Callable]): solver function, or its location as 'module:attribute'
+        exact (bool): whether the solver finds optimal tours
+        non_metric (bool): whether the solver works on problems whose edge lengths are not the
+            Euclidean distances between the cities
+        requires (Tuple[str, ...]): external programs required by the solver
+        description (str): short description of the solver
+    """
+    name: str
+    target: Union[str, Callable]
+    exact: bool = False
+    non_metric: bool = True
+    requires: Tuple[str, ...] = ()
+    description: str = ''
+
+
+_registry: Dict[str, SolverInfo] = {}
+_loaded: Dict[str, Callable] = {}
+
+
+def register(name: str, target: Union[str, Callable], exact: bool = False, non_metric: bool = True,
+             requires: Tuple[str, ...] = (), description: str = '', replace: bool = False) -> SolverInfo:
+    """Register a solver under a name.
+
+    Args:
+        name (str): name of the solver
+        target (Union[str, Callable]): solver function, or its location as 'module:attribute' (to
+            import it on first use)
+        exact (bool, optional): Whether the solver finds optimal tours. Defaults to False.
+        non_metric (bool, optional): Whether the solver works on problems whose edge lengths are not
+            the Euclidean distances between the cities. Defaults to True.
+        requires (Tuple[str, ...], optional): External programs required by the solver. Defaults to ().
+        description (str, optional): Short description of the solver. Defaults to ''.
+        replace (bool, optional): Whether to replace a solver already registered under the name.
+            Defaults to False.
+
+    Raises:
+        ValueError: if a solver is already registered under the name, and replace is False
+
+    Returns:
+        SolverInfo: registered solver
+    """
+    if name in _registry and not replace:
+        raise ValueError(f'a solver is already registered as {name!r}')
+    info = SolverInfo(name, target, exact, non_metric, tuple(requires), description)
+    _registry[name] = info
+    _loaded.pop(name, None)
+    return info
+
+
+def solver_info(name: str) -> SolverInfo:
+    """Look up the description of a registered solver.
+
+    Args:
+        name (str): name of the solver
+
+    Raises:
+        ValueError: if no solver is registered under the name
+
+    Returns:
+        SolverInfo: registered solver
+    """
+    if name not in _registry:
+        raise ValueError(f'unknown solver {name!r} (registered: {", ".join(sorted(_registry))})')
+    return _registry[name]
+
+
+def get_solver(name: str) -> Callable:
+    """Look up a registered solver, importing its implementation if necessary.
+
+    Args:
+        name (str): name of the solver
+
+    Raises:
+        ValueError: if no solver is registered under the name
+
+    Returns:
+        Callable: solver function
+    """
+    if name not in _loaded:
+        target = solver_info(name).target
+        if isinstance(target, str):
+            module, _, attribute = target.partition(':')
+            target = getattr(import_module(module), attribute)
+        _loaded[name] = target
+    return _loaded[name]
+
+
+def list_solvers(exact: bool = None, non_metric: bool = None) -> List[str]:
+    """List the names of registered solvers, optionally only those with the given capabilities.
+
+    Args:
+        exact (bool, optional): Only list solvers which do (or don't) find optimal tours. Defaults
+            to None (either).
+        non_metric (bool, optional): Only list solvers which do (or don't) work on problems whose
+            edge lengths are not Euclidean distances. Defaults to None (either).
+
+    Returns:
+        List[str]: names of solvers, in the order in which they were registered
+    """
+    return [name for name, info in _registry.items()
+            if (exact is None or info.exact == exact) and (non_metric is None or info.non_metric == non_metric)]
+
+
+register('random', 'tsp.core.solvers:random_solve', description='random permutation of the cities')
+register('nearest_neighbor', 'tsp.core.solvers:nearest_neighbor_solve',
+         description='always move on to the nearest unvisited city')
+register('greedy', 'tsp.core.solvers:greedy_solve', description='greedy edge matching')
+register('hilbert', 'tsp.core.solvers:hilbert_solve', non_metric=False,
+         description='order of a Hilbert space-filling curve through the cities')
+register('mst', 'tsp.core.solvers:mst_solve', description='depth-first walk of a minimum spanning tree')
+register('pyramid', 'tsp.core.solvers:pyramid_solve', non_metric=False,
+         description='hierarchical clustering approximating human tours')
+register('two_opt', 'tsp.core.solvers:two_opt_solve', description='2-opt and Or-opt local search')
+register('ils', 'tsp.core.solvers:ils_solve', description='iterated 2-opt and Or-opt local search')
+register('concorde', 'tsp.core.solvers:concorde_solve', exact=True, requires=('concorde',),
+         description='optimal tours from the Concorde solver')
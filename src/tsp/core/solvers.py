@@ -1,9 +1,15 @@
-"""Implements random, optimal, and human-approximate solvers.
+"""Implements random, constructive, optimal, and human-approximate solvers.
 
 The new version of this API implements solvers as procedures which take in a TSP object as their
 single argument (plus additional keyword arguments specific to the model), and returns an array
 of integers corresponding to the indices of the vertices ordered as a tour. You can implement a new
-solver by following this format.
+solver by following this format. A solver may also carry a `batch` attribute: a procedure which
+takes a list of TSPs (plus the same keyword arguments) and returns a list of tours, solving the
+whole list more efficiently than one problem at a time. `tsp.experiment.batch_solver.solve_batch`
+uses it when it is present. Likewise, a solver may carry an `anytime` attribute: a generator which
+produces better and better tours until it is asked to stop, so that the solver can be run under a time
+limit or cancelled, reporting its progress along the way (see `tsp.core.anytime`). Solvers can also be looked up by name (e.g. `problem.solve('pyramid')`)
+through `tsp.core.registry`, where new solvers should be registered as well.
 
 [OLD DOCUMENTATION: Other solvers can be implemented by extending `Solver`, which functions as an
 abstract class. Due to a historical contingency in the depths of the past, the API is somewhat
@@ -16,24 +22,43 @@ serving as syntactical sugar for `Solver.__call__`.]
 The random solver is exactly as advertised - returning a random permutation of the cities as a
 solution.
 
+The constructive solvers build a tour from scratch with a fast heuristic (nearest neighbor, greedy
+edge matching, a Hilbert space-filling curve, or a walk around a minimum spanning tree), as
+implemented in the `tsp.core.constructive` submodule. They give baseline tours for large problems in
+well under a second to a few seconds, and starting tours for the 2-opt solver.
+
 The optimal solver uses the [Concorde](https://www.math.uwaterloo.ca/tsp/concorde.html) backend.
 Sadly, Concorde can be a difficult thing to get working on a machine, but it is the gold standard
 in cognitive science research on TSP. Once you have Concorde installed, it is much easier using
-this library to find optimal tours than using Concorde directly.
+this library to find optimal tours than using Concorde directly. See `tsp.core.concorde` for how
+problems are handed to Concorde; solves are isolated from each other, so they can run in parallel
+(`tsp.experiment.batch_solver.solve_batch` accepts a `workers` argument to do so).
 
 The human-approximate solver uses a hierarchical clustering ("pyramid") algorithm implemented in the
 `tsp.core.pyramid` submodule.
+
+The 2-opt solver improves a tour by local search (2-opt and Or-opt moves), as implemented in the
+`tsp.core.local_search` submodule. It starts from a pyramid tour by default, but can post-process the
+tour of any other solver. It gets within a few percent of optimal on problems of thousands of cities
+in seconds.
+
+The iterated local search solver repeatedly kicks a locally optimal tour with a random double bridge
+move and improves it again, keeping the result when it is no longer. It runs in-process with a time
+limit, random restarts and a reproducible seed, and gets within a few percent of optimal, so it can
+stand in for Concorde as a baseline on large problems or large batches.
 """
 
 
-import os
+from typing import Callable, Iterator
 import warnings
 from numpy.typing import NDArray
 import numpy as np
-from pytsp import dumps_matrix, run as run_concorde
 
 from tsp.core.tsp import N_TSP
-from tsp.core.pyramid import pyramid_solve as pyramid_solve_
+from tsp.core import concorde
+from tsp.core.constructive import greedy_edge, mst_tour, nearest_neighbor, space_filling_curve
+from tsp.core.local_search import iterated_local_search, iterated_local_search_anytime, local_search, local_search_anytime
+from tsp.core.pyramid import pyramid_solve as pyramid_solve_, pyramid_solve_batch
 
 
 def random_solve(tsp: N_TSP, **kwargs) -> NDArray:
@@ -50,8 +75,61 @@ def random_solve(tsp: N_TSP, **kwargs) -> NDArray:
     return vertices
 
 
+def nearest_neighbor_solve(tsp: N_TSP, **kwargs) -> NDArray:
+    """A solver which always moves on to the nearest unvisited city. See
+    `tsp.core.constructive.nearest_neighbor` for possible keyword arguments.
+
+    Args:
+        tsp (N_TSP): TSP to solve
+
+    Returns:
+        NDArray: solution as vertex indices
+    """
+    return nearest_neighbor(tsp, **kwargs)
+
+
+def greedy_solve(tsp: N_TSP, **kwargs) -> NDArray:
+    """A solver which adds edges from shortest to longest (greedy edge matching). See
+    `tsp.core.constructive.greedy_edge` for possible keyword arguments.
+
+    Args:
+        tsp (N_TSP): TSP to solve
+
+    Returns:
+        NDArray: solution as vertex indices
+    """
+    return greedy_edge(tsp, **kwargs)
+
+
+def hilbert_solve(tsp: N_TSP, **kwargs) -> NDArray:
+    """A solver which visits the cities in the order of a Hilbert space-filling curve. See
+    `tsp.core.constructive.space_filling_curve` for possible keyword arguments.
+
+    Args:
+        tsp (N_TSP): TSP to solve
+
+    Returns:
+        NDArray: solution as vertex indices
+    """
+    return space_filling_curve(tsp, **kwargs)
+
+
+def mst_solve(tsp: N_TSP, **kwargs) -> NDArray:
+    """A solver which walks a minimum spanning tree depth first (the "double tree" heuristic). See
+    `tsp.core.constructive.mst_tour` for possible keyword arguments.
+
+    Args:
+        tsp (N_TSP): TSP to solve
+
+    Returns:
+        NDArray: solution as vertex indices
+    """
+    return mst_tour(tsp, **kwargs)
+
+
 def concorde_solve(tsp: N_TSP, **kwargs) -> NDArray:
-    """An optimal solver with the Concorde backend.
+    """An optimal solver with the Concorde backend. See `tsp.core.concorde.solve` for possible
+    keyword arguments.
 
     Args:
         tsp (N_TSP): TSP to solve
@@ -59,22 +137,20 @@ def concorde_solve(tsp: N_TSP, **kwargs) -> NDArray:
     Returns:
         NDArray: solution as vertex indices
     """
-    E = tsp.to_edge_matrix()
-    outf = './tsp.temp'
-    with open(outf, 'w') as dest:
-        dest.write(dumps_matrix(E))
+    return concorde.solve(tsp, **kwargs)
+
 
-    old_dir = os.getcwd()
-    tour = run_concorde(outf, start=0, solver="concorde")
-    os.unlink(outf)
-    os.chdir(old_dir)
-    return np.array(tour['tour'])
+concorde_solve.batch = concorde.solve_batch
 
 
 def pyramid_solve(tsp: N_TSP, **kwargs) -> NDArray:
     """A solver which implements a pyramid approximator. See `tsp.core.pyramid.pyramid_solve` for
     possible keyword arguments.
 
+    Batches of problems are solved with `tsp.core.pyramid.pyramid_solve_batch`, which takes the same
+    keyword arguments (`workers` still refines the subclusters of each problem in parallel), plus
+    `processes`, the number of processes to spread the problems themselves over.
+
     Args:
         tsp (N_TSP): TSP to solve
 
@@ -84,6 +160,60 @@ def pyramid_solve(tsp: N_TSP, **kwargs) -> NDArray:
     return pyramid_solve_(tsp, **kwargs)
 
 
+pyramid_solve.batch = pyramid_solve_batch
+
+
+def two_opt_solve(tsp: N_TSP, tour: NDArray = None, **kwargs) -> NDArray:
+    """A solver which improves a tour by 2-opt and Or-opt local search. See
+    `tsp.core.local_search.local_search` for possible keyword arguments.
+
+    Args:
+        tsp (N_TSP): TSP to solve
+        tour (NDArray, optional): Tour to improve. Defaults to None (start from a pyramid tour).
+
+    Returns:
+        NDArray: solution as vertex indices
+    """
+    if tour is None:
+        tour = pyramid_solve_(tsp, sparse=True)
+    return local_search(tsp, tour, **kwargs)
+
+
+def _two_opt_anytime(tsp: N_TSP, stop: Callable[[], bool], tour: NDArray = None, **kwargs) -> Iterator[NDArray]:
+    if tour is None:
+        tour = pyramid_solve_(tsp, sparse=True)
+    return local_search_anytime(tsp, tour, stop, **kwargs)
+
+
+two_opt_solve.anytime = _two_opt_anytime
+
+
+def ils_solve(tsp: N_TSP, tour: NDArray = None, **kwargs) -> NDArray:
+    """A solver which improves a tour by iterated (chained) 2-opt and Or-opt local search. See
+    `tsp.core.local_search.iterated_local_search` for possible keyword arguments (such as
+    `time_limit`, `restarts` and `seed`).
+
+    Args:
+        tsp (N_TSP): TSP to solve
+        tour (NDArray, optional): Tour to improve. Defaults to None (start from a pyramid tour).
+
+    Returns:
+        NDArray: solution as vertex indices
+    """
+    if tour is None:
+        tour = pyramid_solve_(tsp, sparse=True)
+    return iterated_local_search(tsp, tour, **kwargs)
+
+
+def _ils_anytime(tsp: N_TSP, stop: Callable[[], bool], tour: NDArray = None, **kwargs) -> Iterator[NDArray]:
+    if tour is None:
+        tour = pyramid_solve_(tsp, sparse=True)
+    return iterated_local_search_anytime(tsp, tour, stop, **kwargs)
+
+
+ils_solve.anytime = _ils_anytime
+
+
 class Solver:
     """[DEPRECATED] Abstract class for generic TSP solvers."""
 
@@ -129,17 +259,10 @@ class ConcordeSolver(Solver):
 
     def __init__(self, tsp: N_TSP):
         Solver.__init__(self, tsp)
-        E = tsp.to_edge_matrix()
-        self.outf = './tsp.temp'
-        with open(self.outf, 'w') as dest:
-            dest.write(dumps_matrix(E))
+        self.tsp = tsp
 
     def __call__(self) -> NDArray:
-        old_dir = os.getcwd()
-        tour = run_concorde(self.outf, start=0, solver="concorde")
-        os.unlink(self.outf)
-        os.chdir(old_dir)
-        return np.array(tour['tour'])
+        return concorde.solve(self.tsp)
 
 
 class PyramidSolver(Solver):
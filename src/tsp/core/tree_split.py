@@ -9,23 +9,42 @@ root of this repository (ISC or COIL license).
 """
 
 
-import itertools
-from typing import List, Tuple
+import heapq
+from typing import Dict, List, Tuple
 
 import numpy as np
 from numpy.typing import NDArray
-import matplotlib.pyplot as plt
 from scipy.spatial import distance_matrix
 
 
-def _get_child_edges(v, edges, reject):
-    """Get children of a particular vertex.
+def _adjacency(edges: List) -> Dict[int, List[int]]:
+    """Indices of the edges incident to each vertex, in the order they appear in the edge list."""
+    adjacency = {}
+    for e, (i, j) in enumerate(edges):
+        adjacency.setdefault(i, []).append(e)
+        adjacency.setdefault(j, []).append(e)
+    return adjacency
+
+
+def _get_child_edges(v, edges, reject, adjacency=None):
+    """Get the edges on v's side of the tree once the edge with index `reject` is removed, in depth
+    first preorder (taking the incident edges of each vertex in the order of the edge list).
     """
+    if adjacency is None:
+        adjacency = _adjacency(edges)
     children = []
-    for i,j in edges:
-        if v in (i, j):
-            if reject not in ((i, j), (j, i)):
-                children += [(i,j)] + _get_child_edges(j if i == v else i, edges, (i,j))
+    stack = [(v, reject, iter(adjacency.get(v, [])))]
+    while stack:
+        u, came_from, incident = stack[-1]
+        for e in incident:
+            if e != came_from:
+                children.append(edges[e])
+                i, j = edges[e]
+                w = j if i == u else i
+                stack.append((w, e, iter(adjacency[w])))
+                break
+        else:
+            stack.pop()
     return children
 
 
@@ -33,42 +52,55 @@ def _get_child_verts(child_edges):
     return np.unique(np.array(child_edges).ravel()).tolist()
 
 
-def _get_dmax(edges, D):
-    """This hideous creation:
-    1) finds the distances from each node in the MST to all the leaves.
-    2) Computes and return the maximum of all of these numbers. This is
-        the greatest distance from one leaf to another leaf in the tree.
+def _get_cut_dmax(edges: List, D: NDArray, adjacency: Dict[int, List[int]]) -> List[Tuple[float, float]]:
+    """For every edge (i, j) of a tree, the diameters (greatest leaf to leaf distance) of the
+    subtrees on i's side and on j's side once the edge is removed.
+
+    The tree is rooted at its first vertex, and the diameter and height (greatest distance down to
+    a leaf) of every subtree are computed bottom-up. Then the diameter and height of the rest of the
+    tree, "above" each vertex, are computed top-down from those of its parent and siblings
+    (rerooting), so that the whole thing takes linear time.
     """
-    def inner(v, dcur, edges, D):
-        child_edges = []
-        next_v = []
-        edge_lengths = []
-        if len(edges) == 0:
-            return dcur
-        for i, j in edges:
-            if v in (i, j):
-                child_edges.append(_get_child_edges(j if i == v else i, edges, (i,j)))
-                next_v.append(j if i == v else i)
-                edge_lengths.append(D[i,j])
-
-        return_list = []
-        for k in range(len(child_edges)):
-            g = inner(next_v[k], dcur + edge_lengths[k], child_edges[k], D)
-            if isinstance(g, list):
-                return_list += g
-            else:
-                return_list += [g]
-        return return_list
-
-    verts = _get_child_verts(edges)
-    dmax_by_v = []
-    for v in verts:
-        dmax_by_v += [inner(v, 0, edges, D)]
-
-    dmax_flat = list(itertools.chain(*dmax_by_v))
-    if len(dmax_flat) == 0:
-        return 0
-    return max(dmax_flat)
+    root = edges[0][0]
+    parent = {root: None}
+    order = [root]
+    for u in order:
+        for e in adjacency[u]:
+            i, j = edges[e]
+            w = j if i == u else i
+            if w not in parent:
+                parent[w] = (u, e, float(D[i, j]))
+                order.append(w)
+
+    children = {u: [] for u in order}
+    for w in order[1:]:
+        children[parent[w][0]].append(w)
+
+    height_down, dmax_down = {}, {}
+    for u in reversed(order):
+        heights = [height_down[w] + parent[w][2] for w in children[u]]
+        top = heapq.nlargest(2, heights) + [0., 0.]
+        height_down[u] = top[0]
+        dmax_down[u] = max([top[0] + top[1]] + [dmax_down[w] for w in children[u]])
+
+    height_up, dmax_up = {root: None}, {root: 0.}
+    for u in order:
+        branches = [(height_down[w] + parent[w][2], w) for w in children[u]]
+        if height_up[u] is not None:
+            branches.append((height_up[u], None))
+        top_heights = heapq.nlargest(3, branches, key=lambda b: b[0])
+        top_dmax = heapq.nlargest(2, ((dmax_down[w], w) for w in children[u]), key=lambda b: b[0])
+        for w in children[u]:
+            heights = [h for h, b in top_heights if b != w][:2] + [0., 0.]
+            sibling_dmax = [d for d, b in top_dmax if b != w][:1]
+            height_up[w] = heights[0] + parent[w][2]
+            dmax_up[w] = max([dmax_up[u], heights[0] + heights[1]] + sibling_dmax)
+
+    result = [None] * len(edges)
+    for w in order[1:]:
+        u, e, _ = parent[w]
+        result[e] = (dmax_up[w], dmax_down[w]) if edges[e][0] == u else (dmax_down[w], dmax_up[w])
+    return result
 
 
 def do_split(vertices: List, edges: List, D: NDArray, r: int) -> Tuple[List, List]:
@@ -96,40 +128,35 @@ def do_split(vertices: List, edges: List, D: NDArray, r: int) -> Tuple[List, Lis
     Returns:
         Tuple[List, List]: Lists of vertices defining split clusters, lists of edges
     """
-    if len(vertices) <= r:
-        return [vertices], [edges]
-
-    best_split_ij, smallest_delta = np.inf, np.inf
-    ci_best, cj_best = np.inf, np.inf
-    for i,j in edges:
-        # split edge ij
-        ci = _get_child_edges(i, edges, (i,j))
-        dmax_i = _get_dmax(ci, D)
-        cj = _get_child_edges(j, edges, (i,j))
-        dmax_j = _get_dmax(cj, D)
-        delta = np.abs(dmax_j - dmax_i)
-        if delta < smallest_delta:
-            best_split_ij = (i,j)
-            smallest_delta = delta
-            ci_best = ci
-            cj_best = cj
-
-    if len(ci_best) == 0:
-        vertices_i = [best_split_ij[0]]
-    else:
-        vertices_i = _get_child_verts(ci_best)
-
-    if len(cj_best) == 0:
-        vertices_j = [best_split_ij[1]]
-    else:
-        vertices_j = _get_child_verts(cj_best)
-
-    vertices_i, edges_i = do_split(vertices_i, ci_best, D, r)
-    vertices_j, edges_j = do_split(vertices_j, cj_best, D, r)
-    return vertices_i + vertices_j, edges_i + edges_j
+    clusters_v, clusters_e = [], []
+    stack = [(vertices, edges)]
+    while stack:
+        vertices, edges = stack.pop()
+        if len(vertices) <= r:
+            clusters_v.append(vertices)
+            clusters_e.append(edges)
+            continue
+
+        adjacency = _adjacency(edges)
+        best_split, smallest_delta = None, np.inf
+        for e, (dmax_i, dmax_j) in enumerate(_get_cut_dmax(edges, D, adjacency)):
+            # split edge ij
+            delta = abs(dmax_j - dmax_i)
+            if delta < smallest_delta:
+                best_split = e
+                smallest_delta = delta
+
+        sides = []
+        for v in edges[best_split]:
+            side_edges = _get_child_edges(v, edges, best_split, adjacency)
+            sides.append((_get_child_verts(side_edges) if side_edges else [v], side_edges))
+        stack.extend(reversed(sides))
+    return clusters_v, clusters_e
 
 
 if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
     # define a test case
     np.random.seed(124)
     xy = np.random.uniform(0,10, (20,2))
@@ -4,11 +4,20 @@ for randomly generating 2-dimensional TSPs.
 `N_TSP` is the superclass from which all TSPs here and in `tsp.extra` inherit. It can handle TSPs
 of arbitrary dimension, and implements all the methods needed for a Solver
 (tsp.core.solvers.Solver) to be able to generate a tour. The convention is that TSPs are stored as
-collections of cities, with distance matrices made available as second-class citizens.
+collections of cities, with distance matrices made available as second-class citizens. Distance
+matrices are generated lazily and kept in `N_TSP.edge_cache` until the problem is modified (see
+`tsp.core.distances.EdgeCache`). Edges can also be streamed in blocks of NumPy arrays with
+`N_TSP.edge_chunks`, which takes bounded memory no matter the size of the problem.
 
 `TSP` extends `N_TSP`, enforcing 2-dimensional cities and storing width (`TSP.w`) and height
 (`TSP.h`) attributes. It also implements a constructor (class method) for generating problems with
-uniformly-randomly distributed cities (TSP).
+uniformly-randomly distributed cities (TSP). For large or dense problems, or whole problem sets,
+prefer `TSP.generate_random_incremental` and `TSP.generate_random_batch`, which place cities one at
+a time with a spatial grid instead of starting over whenever two cities are too close:
+
+```python
+problems = TSP.generate_random_batch(1000, 1000, seed=42)  # 1000 1000-city problems
+```
 
 To copy a TSP, you can use the `from_cities` class method. Example usage:
 
@@ -26,12 +35,20 @@ respectively.
 """
 
 
-from typing import Callable, Iterable, Iterator, Tuple, Type, Union
-import itertools as it
-from numpy.typing import NDArray
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Tuple, Type, Union
+from collections import defaultdict
+from threading import Event
+from numbers import Integral
+from numpy.typing import DTypeLike, NDArray
 import numpy.random as random
 import numpy as np
 
+from tsp.core.distances import DEFAULT_CHUNK_SIZE, EdgeCache, edge_matrix, euclidean, upper_triangle_blocks
+from tsp.core.registry import get_solver
+
+if TYPE_CHECKING:
+    from scipy.spatial import cKDTree
+
 
 def distance(path: Iterable[NDArray]) -> float:
     """Calculate the distance along a path of unspecified length.
@@ -43,7 +60,32 @@ def distance(path: Iterable[NDArray]) -> float:
         float: distance
     """
     path = np.array(list(path))
-    return sum(map(lambda i: np.linalg.norm(path[i - 1] - path[i]), range(1, len(path))))
+    if len(path) < 2:
+        return 0.
+    return float(np.sum(np.linalg.norm(np.diff(path, axis=0), axis=1)))
+
+
+def _append_rows(buffer: NDArray, count: int, rows: NDArray) -> NDArray:
+    """Write rows into buffer after its first count rows, reallocating with amortized doubling (and
+    type promotion) if necessary.
+
+    Args:
+        buffer (NDArray): buffer, of which the first count rows are in use
+        count (int): number of rows in use
+        rows (NDArray): rows to append
+
+    Returns:
+        NDArray: buffer (possibly reallocated)
+    """
+    dtype = rows.dtype if count == 0 else np.result_type(buffer.dtype, rows.dtype)
+    needed = count + len(rows)
+    if buffer.shape[1:] != rows.shape[1:] or buffer.dtype != dtype or len(buffer) < needed:
+        grown = np.empty((max(needed, 2 * len(buffer)),) + rows.shape[1:], dtype=dtype)
+        if count:
+            grown[:count] = buffer[:count]
+        buffer = grown
+    buffer[count:needed] = rows
+    return buffer
 
 
 class N_TSP:
@@ -61,8 +103,43 @@ class N_TSP:
         return result
 
     def __init__(self):
+        self._version = 0
+        self._city_lookup = None
+        self.edge_cache = EdgeCache()
         self.cities = np.array([])
 
+    @property
+    def cities(self) -> NDArray:
+        """Cities as [[x1, y1, ...], ...]. Assigning to this invalidates cached data; if you modify
+        the array in place, call `invalidate` yourself.
+
+        Cities are kept in a preallocated buffer which grows geometrically, so this is a view of the
+        part of the buffer in use.
+
+        Returns:
+            NDArray: cities
+        """
+        return self._city_buffer[:self._city_count]
+
+    @cities.setter
+    def cities(self, cities: NDArray):
+        self._city_buffer = np.asarray(cities)
+        self._city_count = len(self._city_buffer)
+        self.invalidate()
+
+    @property
+    def version(self) -> int:
+        """Number of modifications made to the problem, used to invalidate cached data.
+
+        Returns:
+            int: version
+        """
+        return self._version
+
+    def invalidate(self):
+        """Mark the problem as modified, so that cached data (edge matrices, etc.) is regenerated."""
+        self._version += 1
+
     @property
     def dimensions(self) -> int:
         """Number of dimensions the N_TSP problem is in.
@@ -73,15 +150,37 @@ class N_TSP:
         return self.cities.shape[1]
 
     def add_city(self, *coords: int):
-        """Inefficiently adds a city to the problem.
+        """Adds a city to the problem (in amortized constant time).
 
         Args:
             coords ([int]): city coordinates as individual arguments
         """
-        assert self.cities.shape[0] == 0 or len(coords) == self.dimensions
-        self.cities = list(self.cities)
-        self.cities.append(np.array(coords))
-        self.cities = np.array(self.cities)
+        self.add_cities(np.array([coords]))
+
+    def add_cities(self, cities: NDArray):
+        """Adds a batch of cities to the problem at once.
+
+        Args:
+            cities (NDArray): cities as [[x1, y1, ...], ...]
+        """
+        cities = np.asarray(cities)
+        if len(cities) == 0:
+            return
+        assert cities.ndim == 2 and (self._city_count == 0 or cities.shape[1] == self.dimensions)
+        self._city_buffer = _append_rows(self._city_buffer, self._city_count, cities)
+        self._city_count += len(cities)
+        self.invalidate()
+
+    @property
+    def euclidean(self) -> bool:
+        """Whether edge lengths are the Euclidean distances between cities (that is, neither `edge`
+        nor `edge_batch` is overridden by a subclass), so that they can be computed from the cities
+        alone.
+
+        Returns:
+            bool: True if edges are Euclidean
+        """
+        return type(self).edge is N_TSP.edge and type(self).edge_batch is N_TSP.edge_batch
 
     def edge(self, a: int, b: int) -> float:
         """Edge length between two cities.
@@ -95,38 +194,105 @@ class N_TSP:
         """
         return np.linalg.norm(self.cities[a] - self.cities[b])
 
+    def edge_chunks(self, chunk_size: int = None) -> Iterator[Tuple[NDArray, NDArray, NDArray]]:
+        """Produces the edges (a[i], b[i], d[i]) of distance d[i] between vertices a[i] < b[i] in
+        blocks of at most `chunk_size` edges (or a single row of the edge matrix, if that is longer),
+        in the same order as `to_edges`. Distances come from a cached edge matrix if there is one, and
+        are computed block by block with `edge_batch` otherwise, so memory use is bounded by the size
+        of a block.
+
+        Args:
+            chunk_size (int, optional): Maximum number of edges per block. Defaults to
+                `tsp.core.distances.DEFAULT_CHUNK_SIZE`.
+
+        Yields:
+            Iterator[Tuple[NDArray, NDArray, NDArray]]: indices of first and second vertices, and distances
+        """
+        condensed = self.edge_cache.peek(self._version, np.float64, condensed=True)
+        square = None if condensed is not None else self.edge_cache.peek(self._version, np.float64)
+        offset = 0
+        for a, b in upper_triangle_blocks(len(self.cities), chunk_size):
+            if condensed is not None:
+                d = condensed[offset:offset + len(a)]
+            elif square is not None:
+                d = square[a, b]
+            else:
+                d = np.asarray(self.edge_batch(a, b), dtype=np.float64)
+            offset += len(a)
+            yield a, b, d
+
     def to_edges(self) -> Iterator[Tuple[int, int, float]]:
-        """Produces iterable of edges (a, b, d) of distance d between vertices a and b.
+        """Produces iterable of edges (a, b, d) of distance d between vertices a and b. Prefer
+        `edge_chunks` for anything but small problems.
 
         Yields:
             Iterator[int, int, float]: edges
         """
-        for a, b in it.combinations(range(len(self.cities)), 2):
-            yield a, b, self.edge(a, b)
+        for a, b, d in self.edge_chunks():
+            yield from zip(a.tolist(), b.tolist(), d.tolist())
+
+    def edge_batch(self, a: NDArray, b: NDArray) -> NDArray:
+        """Vectorized edge lengths between cities a[i] and b[i] (index arrays are broadcast together).
 
-    def to_edge_matrix(self) -> NDArray:
-        """Generate an edge matrix from the problem.
+        This is the kernel used by `to_edge_matrix`. Subclasses which override `edge` should also
+        override this with a batched version of their own; otherwise, it falls back to calling
+        `edge` once per pair.
+
+        Args:
+            a (NDArray): indices of first cities
+            b (NDArray): indices of second cities
 
         Returns:
-            NDArray: edge matrix
+            NDArray: edge lengths
         """
-        count = len(self.cities)
-        result = np.zeros((count, count), dtype=np.float32)
-        for a, b, d in self.to_edges():
-            result[a, b] = d
-        il = np.tril_indices(count)
-        result[il] = result.T[il]  # Make symmetric  # pylint: disable=E1136
-        return result
+        if type(self).edge is not N_TSP.edge:
+            return np.vectorize(self.edge, otypes=[np.float64])(a, b)
+        return euclidean(self.cities, a, b)
+
+    def _build_edge_matrix(self, dtype: DTypeLike, condensed: bool, chunk_size: int) -> NDArray:
+        return edge_matrix(self.edge_batch, len(self.cities), dtype, condensed, chunk_size)
+
+    def to_edge_matrix(self, dtype: DTypeLike = np.float32, condensed: bool = False, chunk_size: int = None) -> NDArray:
+        """Generate an edge matrix from the problem. The matrix is kept in `edge_cache` until the
+        problem is modified, so it should be treated as read-only.
 
-    def solve(self, solver: Union[Callable, Type], **kwargs) -> NDArray:
+        Args:
+            dtype (DTypeLike, optional): Data type of the matrix. Defaults to np.float32.
+            condensed (bool, optional): Whether to store only the upper triangle (see
+                `tsp.core.distances`). Defaults to False.
+            chunk_size (int, optional): Maximum number of edges computed at once. Defaults to
+                `tsp.core.distances.DEFAULT_CHUNK_SIZE`.
+
+        Returns:
+            NDArray: edge matrix
+        """
+        return self.edge_cache.get(
+            self._version,
+            lambda: self._build_edge_matrix(dtype, condensed, chunk_size),
+            dtype,
+            condensed
+        )
+
+    def solve(self, solver: Union[str, Callable, Type], callback: Callable = None, cancel: Event = None,
+              **kwargs) -> NDArray:
         """Generate a tour using a Solver.
 
         Args:
-            solver (Union[Callable, Type]): a solver function from `tsp.core.solvers`
+            solver (Union[str, Callable, Type]): a solver function from `tsp.core.solvers`, or the
+                name of a solver in `tsp.core.registry` (such as 'pyramid' or 'concorde')
+            callback (Callable, optional): Procedure called with each better tour found, as a
+                `tsp.core.anytime.Progress` record (see `tsp.core.anytime.solve_anytime`). Defaults to None.
+            cancel (Event, optional): Event which stops the solver when set, returning the best tour
+                found so far. Defaults to None.
 
         Returns:
             NDArray: tour
         """
+        if callback is not None or cancel is not None:
+            from tsp.core.anytime import solve_anytime  # pylint: disable=import-outside-toplevel
+            return solve_anytime(self, solver, callback=callback, cancel=cancel, **kwargs)
+        if isinstance(solver, str):
+            solver = get_solver(solver)
         if isinstance(solver, Type):
             return np.array(solver(self)())  # for compatibility with old API
         return np.array(solver(self, **kwargs))
@@ -144,19 +310,55 @@ class N_TSP:
             yield self.cities[c]
         yield self.cities[tour[0]]
 
-    def convert_tour_segments(self, tour_segments: Iterable[NDArray]) -> Iterator[int]:
-        """Convert a tour in segment format into a tour in index format.
+    def _city_index(self) -> Dict[Tuple, int]:
+        if self._city_lookup is None or self._city_lookup[0] != self._version:
+            index = {}
+            for i, coord in enumerate(map(tuple, self.cities.tolist())):
+                index.setdefault(coord, i)  # duplicate cities resolve to the first, like list.index
+            self._city_lookup = (self._version, index, None)
+        return self._city_lookup[1]
+
+    def _city_tree(self) -> 'cKDTree':
+        from scipy.spatial import cKDTree  # pylint: disable=import-outside-toplevel
+        self._city_index()
+        if self._city_lookup[2] is None:
+            self._city_lookup = self._city_lookup[:2] + (cKDTree(self.cities),)
+        return self._city_lookup[2]
+
+    def convert_tour_segments(self, tour_segments: Iterable[NDArray], tol: float = 0.) -> List[int]:
+        """Convert a tour in segment format into a tour in index format. The last point of the tour
+        (a repeat of the first) is dropped.
+
+        Coordinates are looked up in a table which is built once and kept until the problem is
+        modified, so converting a tour takes linear time.
 
         Args:
             tour_segments (Iterable[NDArray]): tour as coordinates of cities
+            tol (float, optional): If positive, match each point to the nearest city within this
+                distance, for coordinates which may have picked up rounding errors (e.g., from the
+                UI). Defaults to 0 (exact matches only).
 
-        Yields:
-            Iterator[int]: tour as indices of cities
+        Raises:
+            ValueError: some points do not match any city
+
+        Returns:
+            List[int]: tour as indices of cities
         """
-        cities = list(map(tuple, self.cities))
-        tour_segments = list(map(tuple, tour_segments))
-        for coord in tour_segments[:-1]:
-            yield cities.index(coord)
+        points = list(map(tuple, np.asarray(list(tour_segments)).tolist()))[:-1]
+        if not points:
+            return []
+        if tol > 0:
+            _, result = self._city_tree().query(points, distance_upper_bound=tol)
+            result = result.tolist()
+            unmatched = [p for p, i in zip(points, result) if i == len(self.cities)]
+        else:
+            index = self._city_index()
+            result = [index.get(p) for p in points]
+            unmatched = [p for p, i in zip(points, result) if i is None]
+        if unmatched:
+            shown = ', '.join(map(str, unmatched[:10])) + (f' (and {len(unmatched) - 10} more)' if len(unmatched) > 10 else '')
+            raise ValueError(f'{len(unmatched)} tour point(s) do not match any city: {shown}')
+        return result
 
     def score_indices(self, tour: Iterable[int]) -> float:
         """Calculate tour length (from index format).
@@ -167,17 +369,28 @@ class N_TSP:
         Returns:
             float: tour length
         """
-        result = 0.
-        first = None
-        prev = None
-        for c in tour:
-            if prev is None:
-                first = c
-                prev = c
-                continue
-            result += self.edge(prev, c)
-            prev = c
-        result += self.edge(c, first)
+        tour = np.fromiter(tour, dtype=int)
+        return float(np.sum(self.edge_batch(tour, np.roll(tour, -1))))
+
+    def score_many(self, tours: NDArray, chunk_size: int = None) -> NDArray:
+        """Calculate tour lengths for many tours of the same length (in index format) at once.
+
+        Args:
+            tours (NDArray): tours as a 2D array, one tour of indices of cities per row
+            chunk_size (int, optional): Maximum number of edges scored at once. Defaults to
+                `tsp.core.distances.DEFAULT_CHUNK_SIZE`.
+
+        Returns:
+            NDArray: tour lengths
+        """
+        tours = np.asarray(tours, dtype=int)
+        if chunk_size is None:
+            chunk_size = DEFAULT_CHUNK_SIZE
+        rows = max(1, chunk_size // max(1, tours.shape[1]))
+        result = np.empty(len(tours), dtype=np.float64)
+        for start in range(0, len(tours), rows):
+            block = tours[start:start + rows]
+            result[start:start + rows] = np.sum(self.edge_batch(block, np.roll(block, -1, axis=1)), axis=1)
         return result
 
     def score_tour_segments(self, tour_segments: Iterable[NDArray]) -> float: # pylint: disable=no-self-use
@@ -201,11 +414,77 @@ class N_TSP:
             float: tour length
         """
         s = list(tour)
-        if isinstance(s[0], int):
+        if isinstance(s[0], Integral):
             return self.score_indices(s)
         return self.score_tour_segments(s)
 
 
+def poisson_disk_cities(n: int, w: int = 500, h: int = 500, r: int = 10, padding: int = 10,
+                        rng: random.Generator = None, max_rejections: int = None) -> Tuple[NDArray, int]:
+    """Place uniformly-distributed random cities one at a time, rejecting any candidate within r of a
+    city already placed (Poisson-disk style). Candidates are checked against a grid of cells of
+    width r / sqrt(2), each of which can hold at most one city, so only the 5 x 5 block of cells
+    around a candidate needs to be searched.
+
+    Args:
+        n (int): number of cities
+        w (int, optional): Width of problem. Defaults to 500.
+        h (int, optional): Height of problem. Defaults to 500.
+        r (int, optional): Minimum distance between cities. Defaults to 10.
+        padding (int, optional): Minimum distance a city can be from the edge. Defaults to 10.
+        rng (random.Generator, optional): Random number generator. Defaults to a fresh one.
+        max_rejections (int, optional): Give up after this many rejections. Defaults to 1000 * n.
+
+    Raises:
+        RuntimeError: too many rejections (r is too large for the area)
+
+    Returns:
+        Tuple[NDArray, int]: (cities as [[x1, y1], ...], number of rejected candidates)
+    """
+    if rng is None:
+        rng = random.default_rng()
+    if max_rejections is None:
+        max_rejections = 1000 * n
+    cities = np.empty((n, 2), dtype=int)
+    cell = r / np.sqrt(2) if r > 0 else np.inf
+    grid = np.full((int((w - 2 * padding) / cell) + 5, int((h - 2 * padding) / cell) + 5), -1, dtype=int)
+    offsets = np.arange(-2, 3)
+    count = 0
+    rejections = 0
+    while count < n:
+        # Draw candidates in batches, but accept or reject them exactly as if one at a time
+        batch = min(max(n - count, 16), 1024)
+        candidates = np.stack([rng.integers(padding, w - padding, size=batch),
+                               rng.integers(padding, h - padding, size=batch)], axis=1)
+        gx = ((candidates[:, 0] - padding) / cell).astype(int) + 2
+        gy = ((candidates[:, 1] - padding) / cell).astype(int) + 2
+        neighbors = grid[gx[:, None, None] + offsets[None, :, None], gy[:, None, None] + offsets[None, None, :]]
+        neighbors = neighbors.reshape(batch, -1)
+        d2 = np.sum(np.square(cities[np.maximum(neighbors, 0)] - candidates[:, None, :]), axis=2)
+        ok = ~np.any((neighbors >= 0) & (d2 < r * r), axis=1)
+        survivors = np.flatnonzero(ok)
+        if r > 0 and len(survivors) > 1:
+            from scipy.spatial import cKDTree  # pylint: disable=import-outside-toplevel
+            pairs = cKDTree(candidates[survivors]).query_pairs(r, output_type='ndarray')
+            pairs = pairs[np.sum(np.square(candidates[survivors[pairs[:, 0]]] - candidates[survivors[pairs[:, 1]]]), axis=1) < r * r]
+            earlier = defaultdict(list)
+            for i, j in np.sort(pairs, axis=1).tolist():
+                earlier[j].append(i)
+            accepted = [True] * len(survivors)
+            for j in sorted(earlier):
+                accepted[j] = not any(accepted[i] for i in earlier[j])
+            ok[survivors] = accepted
+        placed = np.flatnonzero(ok)[:n - count]
+        considered = placed[-1] + 1 if count + len(placed) == n else batch
+        rejections += considered - len(placed)
+        cities[count:count + len(placed)] = candidates[placed]
+        grid[gx[placed], gy[placed]] = np.arange(count, count + len(placed))
+        count += len(placed)
+        if rejections > max_rejections:
+            raise RuntimeError(f'placed only {count} of {n} cities after {rejections} rejections')
+    return cities, rejections
+
+
 class TSP(N_TSP):
     """Container for a 2D TSP instance. A wrapper which adds constraints to the N_TSP interface, primarily width and height."""
 
@@ -222,13 +501,63 @@ class TSP(N_TSP):
         """
         while True:
             result = cls(w, h)
-            for _ in range(n):
-                x = random.randint(padding, w - padding)
-                y = random.randint(padding, h - padding)
-                result.add_city(x, y)
-            if min(d for _, __, d in result.to_edges()) >= r:
+            cities = np.empty((n, 2), dtype=int)
+            for i in range(n):
+                cities[i, 0] = random.randint(padding, w - padding)
+                cities[i, 1] = random.randint(padding, h - padding)
+            result.add_cities(cities)
+            if all(d.min() >= r for _, __, d in result.edge_chunks()):
                 return result
 
+    @classmethod
+    def generate_random_incremental(cls, n: int, w: int = 500, h: int = 500, r: int = 10, padding: int = 10,
+                                    seed: Union[int, random.SeedSequence, random.Generator] = None,
+                                    max_rejections: int = None):
+        """Generate a new problem with uniformly-distributed random cities, placing them one at a time
+        (see `poisson_disk_cities`) rather than regenerating the whole problem whenever two cities
+        are too close together. This is much faster for large or dense problems, although the
+        distribution of cities is not exactly the same as that of `generate_random`. The number of
+        rejected candidates is stored in the `rejections` attribute of the result.
+
+        Args:
+            n (int): number of cities
+            w (int, optional): Width of problem. Defaults to 500.
+            h (int, optional): Height of problem. Defaults to 500.
+            r (int, optional): Minimum distance between cities. Defaults to 10.
+            padding (int, optional): Minimum distance a city can be from the edge. Defaults to 10.
+            seed (Union[int, random.SeedSequence, random.Generator], optional): Seed or random number
+                generator. Defaults to None (fresh entropy).
+            max_rejections (int, optional): Give up after this many rejections. Defaults to 1000 * n.
+        """
+        cities, rejections = poisson_disk_cities(n, w, h, r, padding, random.default_rng(seed), max_rejections)
+        result = cls(w, h)
+        result.add_cities(cities)
+        result.rejections = rejections
+        return result
+
+    @classmethod
+    def generate_random_batch(cls, count: int, n: int, w: int = 500, h: int = 500, r: int = 10, padding: int = 10,
+                              seed: Union[int, random.SeedSequence] = None) -> List:
+        """Generate a batch of problems with `generate_random_incremental`. Each problem gets its own
+        independent random stream spawned from the seed, so problem i of a batch is reproducible from
+        the seed alone.
+
+        Args:
+            count (int): number of problems
+            n (int): number of cities per problem
+            w (int, optional): Width of problems. Defaults to 500.
+            h (int, optional): Height of problems. Defaults to 500.
+            r (int, optional): Minimum distance between cities. Defaults to 10.
+            padding (int, optional): Minimum distance a city can be from the edge. Defaults to 10.
+            seed (Union[int, random.SeedSequence], optional): Seed. Defaults to None (fresh entropy).
+
+        Returns:
+            List: problems
+        """
+        if not isinstance(seed, random.SeedSequence):
+            seed = random.SeedSequence(seed)
+        return [cls.generate_random_incremental(n, w, h, r, padding, s) for s in seed.spawn(count)]
+
     @classmethod
     def from_cities(cls, cities: NDArray, w: int = 500, h: int = 500):
         """Generate object from list/array of cities.
@@ -239,8 +568,7 @@ class TSP(N_TSP):
             h (int, optional): Height of problem. Defaults to 500.
         """
         result = cls(w, h)
-        for x, y in cities:
-            result.add_city(int(x), int(y))
+        result.add_cities(np.asarray(cities).astype(int))
         return result
 
     def __init__(self, w: int = 500, h: int = 500):
@@ -9,21 +9,25 @@ motion.
 `visualize_tsp_plt` and `visualize_mst_plt` are similar to their associated `_pil` procedures, but
 use the MatPlotLib backend. Can also be used to generate image files using the associated
 MatPlotLib directives, but are also great for inlining in Jupyter notebooks, etc.
+
+OpenCV and MatPlotLib are only imported when a procedure needs them, so that importing this module
+stays cheap (and works where they aren't installed).
 """
 
 
+from __future__ import annotations
 from math import sin, cos, radians
-from typing import Iterable, Tuple, Union
+from typing import TYPE_CHECKING, Iterable, Tuple, Union
 from numbers import Number
 from numpy.typing import NDArray
 import numpy as np
 from PIL import Image, ImageDraw
-from cv2 import cv2
-import matplotlib.pyplot as plt
-from matplotlib.axes import SubplotBase
 
 from tsp.core.tsp import N_TSP, TSP
 
+if TYPE_CHECKING:
+    from matplotlib.axes import SubplotBase
+
 
 def _draw_edges_pil(im: Image, tsp: TSP, edges: Iterable[Tuple[int, int]]):
     draw = ImageDraw.Draw(im)
@@ -89,6 +93,8 @@ def visualize_3d(tsp: N_TSP, tour: Iterable[Union[int, NDArray]], path: str, ste
         step (int, optional): Degrees to rotate per frame. Defaults to 1.
         time (int, optional): Duration of generated video. Defaults to 12.
     """
+    import cv2  # pylint: disable=import-outside-toplevel
+
     assert tsp.dimensions == 3
     min_x, min_y, max_x, max_y = float('inf'), float('inf'), float('-inf'), float('-inf')
     for alpha in range(0, 360, step):
@@ -149,6 +155,7 @@ def _draw_tour_plt(ax: SubplotBase, tsp: TSP, tour: Iterable[Union[int, NDArray]
 
 def _init_plot(ax: SubplotBase, tsp: TSP):
     if ax is None:
+        import matplotlib.pyplot as plt  # pylint: disable=import-outside-toplevel
         ax = plt.subplot(111)
 
     ax.set_xlim((0, tsp.w))
@@ -2,13 +2,16 @@
 """
 
 
-from typing import Iterable, Tuple
-from matplotlib.axes import SubplotBase
+from __future__ import annotations
+from typing import TYPE_CHECKING, Iterable, Tuple
 
 from tsp.core.pyramid_old import DSNode
 from tsp.core.tsp import TSP
 from tsp.core.viz import _draw_cities_plt, _draw_edges_plt, _init_plot
 
+if TYPE_CHECKING:
+    from matplotlib.axes import SubplotBase
+
 
 def _isolate_edges(mst: Iterable[Tuple[int, int]], clusters: Iterable[DSNode]):
     for cluster in clusters:
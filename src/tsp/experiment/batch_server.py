@@ -102,7 +102,7 @@ def _get_visgraph(id_: int):
     id_ = MAPPING[id_]
     response.content_type = 'application/json'
     vertex = tuple(json.loads(request.forms.get('data'))) # pylint: disable=no-member
-    return [json.dumps(batch[id_].to_visgraph()[vertex] if 'obstacles' in batch[id_].__dict__ else batch[id_].cities.tolist())]
+    return [json.dumps(batch[id_].to_visgraph().get(vertex, []) if 'obstacles' in batch[id_].__dict__ else batch[id_].cities.tolist())]
 
 
 # Static
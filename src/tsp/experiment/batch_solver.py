@@ -2,7 +2,9 @@
 programmatically (e.g., with the Concorde solver), and computing statistics for problem sets.
 
 `solve_batch` takes in a set of problems saved using `tsp.experiment.batch.save_problem_batch` and
-produces a set of solutions using the provided Solver.
+produces a set of solutions using the provided Solver. Given a callback or a cancellation event, it
+solves the problems one at a time as anytime solves (see `tsp.core.anytime`), reporting progress on
+each problem.
 
 `score_tours_absolute` and `score_tours_relative` are used to compute the distance (in the
 absolute case) and the error (in the relative case) of a set of tours.
@@ -12,32 +14,56 @@ automate the calculation of statistics for experiments we've done.
 """
 
 
+from functools import partial
+from threading import Event
 from typing import Callable, List, Tuple, Type, Union
 from numpy.typing import NDArray
 import numpy as np
 
+from tsp.core.anytime import Progress, solve_anytime
+from tsp.core.registry import get_solver
 from tsp.core.tsp import N_TSP
 from tsp.experiment.batch import load_list_batch, load_problem_batch, save_list_batch
 
 
-def solve_batch(src: str, solver: Union[Callable, Type], dest: str = None, **kwargs) -> List[List[int]]:
+def solve_batch(src: str, solver: Union[str, Callable, Type], dest: str = None,
+                callback: Callable[[int, Progress], None] = None, cancel: Event = None, **kwargs) -> List[List[int]]:
     """Use a solver to generate tours for a batch of problems.
 
     Args:
         src (str): path of root where problems are saved
-        solver (Union[Callable, Type]): a solver function from `tsp.core.solvers`
+        solver (Union[str, Callable, Type]): a solver function from `tsp.core.solvers`, or the name of
+            a solver in `tsp.core.registry` (solvers with a `batch` attribute, such as
+            `pyramid_solve`, solve the whole batch at once)
         dest (str, optional): Path of root to save tours. Defaults to None.
+        callback (Callable[[int, Progress], None], optional): Procedure called with the index of the
+            problem and a `tsp.core.anytime.Progress` record each time a better tour is found. If
+            given, problems are solved one at a time with `tsp.core.anytime.solve_anytime` (so that
+            a `time_limit` applies to each problem). Defaults to None.
+        cancel (Event, optional): Event which, when set, stops the solver (and makes it settle for
+            the first tour it finds for any problems left). Implies solving problems one at a time,
+            like callback. Defaults to None.
 
     Returns:
         List[List[int]]: tours
     """
+    if isinstance(solver, str):
+        solver = get_solver(solver)
     batch = load_problem_batch(src)
-    tours = []
-    for p in batch:
-        if isinstance(solver, Type):
-            tours.append(solver(p)())  # for compatibility with old API
-        else:
-            tours.append(solver(p, **kwargs))
+    if callback is not None or cancel is not None:
+        tours = []
+        for i, p in enumerate(batch):
+            report = None if callback is None else partial(callback, i)
+            tours.append(solve_anytime(p, solver, callback=report, cancel=cancel, **kwargs))
+    elif hasattr(solver, 'batch'):
+        tours = list(solver.batch(batch, **kwargs))
+    else:
+        tours = []
+        for p in batch:
+            if isinstance(solver, Type):
+                tours.append(solver(p)())  # for compatibility with old API
+            else:
+                tours.append(solver(p, **kwargs))
     if dest is not None:
         save_list_batch(tours, dest, 'sol')
     return tours
@@ -110,15 +136,15 @@ def score_batch_2(problems_path: str, tours_path: str, base_tours_path: str) ->
     return score_tours_relative(problems, tours, base)
 
 
-def _load_all_tour_segments_to_indices(problems: N_TSP, tours_path: str) -> Callable:
+def _load_all_tour_segments_to_indices(problems: N_TSP, tours_path: str, tol: float = 0.) -> Callable:
     tours = load_list_batch(tours_path, 'sol')
     result = []
     for problem, tour in zip(problems, tours):
-        result.append(problem.convert_tour_segments(tour))
+        result.append(problem.convert_tour_segments(tour, tol))
     return result
 
 
-def score_batch_3(problems_path: str, tours_path: str, base_tours_path: str) -> Tuple[NDArray, float, float]:
+def score_batch_3(problems_path: str, tours_path: str, base_tours_path: str, tol: float = 0.) -> Tuple[NDArray, float, float]:
     """Calculate tour errors relative to reference tours, for use on serialized problems and tours.
     Expects serialized tours (in tours_path) to be in segment format (i.e., generated by a human subject),
     and converts them to index format.
@@ -128,11 +154,13 @@ def score_batch_3(problems_path: str, tours_path: str, base_tours_path: str) ->
         problems_path (str): path of root where problems are saved
         tours_path (str): path of root where tours are saved (in segment format)
         base_tours_path (str): path of root where reference tours are saved
+        tol (float, optional): Tolerance for matching tour points to cities (see
+            `tsp.core.tsp.N_TSP.convert_tour_segments`). Defaults to 0 (exact matches only).
 
     Returns:
         Tuple[NDArray, float, float]: (proportional errors, mean error, standard error of mean)
     """
     problems = load_problem_batch(problems_path)
-    tours = _load_all_tour_segments_to_indices(problems, tours_path)
+    tours = _load_all_tour_segments_to_indices(problems, tours_path, tol)
     base = load_list_batch(base_tours_path, 'sol')
     return score_tours_relative(problems, tours, base)
@@ -9,10 +9,12 @@ Note that this is the least developed code in the library.
 
 
 from typing import Iterable, Tuple
+from numpy.typing import NDArray
 import numpy.random as random
 import numpy as np
 
-from tsp.core.tsp import N_TSP
+from tsp.core.distances import euclidean
+from tsp.core.tsp import N_TSP, _append_rows
 
 
 class TSP_Color(N_TSP):
@@ -31,13 +33,14 @@ class TSP_Color(N_TSP):
         """
         result = cls(w, h, penalty)
         n_total = sum(n_colors)
-        while len(set(result.cities)) < n_total:
-            result = cls(w, h)
-            for c, n in enumerate(n_colors):
-                for _ in range(n):
-                    x = random.randint(10, w - 10)
-                    y = random.randint(10, h - 10)
-                    result.add_city(x, y, c)
+        while len(np.unique(result.cities, axis=0)) < n_total:
+            result = cls(w, h, penalty)
+            cities = np.empty((n_total, 2), dtype=int)
+            colors = np.repeat(np.arange(len(n_colors)), n_colors)
+            for i in range(n_total):
+                cities[i, 0] = random.randint(10, w - 10)
+                cities[i, 1] = random.randint(10, h - 10)
+            result.add_cities(cities, colors)
         return result
 
     @classmethod
@@ -51,9 +54,11 @@ class TSP_Color(N_TSP):
             penalty (float, optional): Distance multiplier when traveling between colors. Defaults to 2.0.
         """
         result = cls(w, h, penalty)
-        for xy, c in cities:
-            x, y = xy
-            result.add_city(int(x), int(y), int(c))
+        cities = list(cities)
+        result.add_cities(
+            np.array([xy for xy, _ in cities]).astype(int).reshape(-1, 2),
+            np.array([c for _, c in cities]).astype(int)
+        )
         return result
 
     def __init__(self, w: int = 500, h: int = 500, penalty: float = 2.):
@@ -62,18 +67,52 @@ class TSP_Color(N_TSP):
         self.penalty = penalty
         self.colors = np.array([])
 
+    @property
+    def colors(self) -> NDArray:
+        """Color of each city. Like `cities`, this is a view of a growable buffer.
+
+        Returns:
+            NDArray: colors
+        """
+        return self._color_buffer[:len(self.cities)]
+
+    @colors.setter
+    def colors(self, colors: NDArray):
+        self._color_buffer = np.asarray(colors)
+        self.invalidate()
+
     def add_city(self, x: int, y: int, color: int):
-        """Inefficiently adds a (colored) city to the problem.
+        """Adds a (colored) city to the problem (in amortized constant time).
 
         Args:
             x (int): city x
             y (int): city y
             color (int): city color
         """
-        N_TSP.add_city(x, y)
-        self.colors = list(self.colors)
-        self.colors.append(color)
-        self.colors = np.array(self.colors)
+        self.add_cities(np.array([[x, y]]), np.array([color]))
+
+    def add_cities(self, cities: NDArray, colors: NDArray = None):
+        """Adds a batch of (colored) cities to the problem at once.
+
+        Unlike `N_TSP.add_cities`, this takes the colors of the cities as well, which are required
+        unless there are no cities to add (the default only keeps the signature compatible).
+
+        Args:
+            cities (NDArray): cities as [[x1, y1], ...]
+            colors (NDArray, optional): color of each city. Defaults to None.
+
+        Raises:
+            ValueError: if colors are missing, or there are not as many colors as cities
+        """
+        if colors is None:
+            if len(cities):
+                raise ValueError(f'missing colors: TSP_Color.add_cities needs a color for each of the {len(cities)} cities')
+            colors = np.empty(0, dtype=self._color_buffer.dtype)
+        colors = np.asarray(colors)
+        if len(colors) != len(cities):
+            raise ValueError(f'expected {len(cities)} colors, not {len(colors)}')
+        self._color_buffer = _append_rows(self._color_buffer, len(self.cities), colors)
+        N_TSP.add_cities(self, cities)
 
     def edge(self, a: int, b: int) -> float:
         """Edge length between two cities, taking into account penalties for switching colors.
@@ -92,3 +131,17 @@ class TSP_Color(N_TSP):
         for i, j in zip(A, B):
             diffsum += (i - j) ** 2
         return np.sqrt(diffsum) * penalty
+
+    def edge_batch(self, a: NDArray, b: NDArray) -> NDArray:
+        """Vectorized edge lengths between cities a[i] and b[i], taking into account penalties for
+        switching colors.
+
+        Args:
+            a (NDArray): indices of first cities
+            b (NDArray): indices of second cities
+
+        Returns:
+            NDArray: edge lengths
+        """
+        d = euclidean(self.cities, a, b)
+        return np.where(self.colors[a] == self.colors[b], d, d * self.penalty)
@@ -1,4 +1,5 @@
 """Generate multidimensional scaling (MDS) reconstructions of TSP-Os and TSPs with color.
+scikit-learn is only imported when `do_mds` is first called.
 """
 
 
@@ -6,7 +7,6 @@ from typing import Tuple
 from numpy.typing import NDArray
 import numpy as np
 import scipy as sp
-from sklearn.manifold import MDS
 
 from tsp.core.tsp import N_TSP, TSP
 
@@ -21,12 +21,9 @@ def stress(tsp_a: N_TSP, tsp_b: N_TSP) -> float:
     Returns:
         float: stress
     """
-    sqsum = 0.
-    diffsum = 0.
-    for a, b in zip(tsp_a.to_edges(), tsp_b.to_edges()):
-        sqsum += a[2] ** 2
-        diffsum += (a[2] - b[2]) ** 2
-    return np.sqrt(diffsum / sqsum)
+    a = tsp_a.to_edge_matrix(np.float64, condensed=True)
+    b = tsp_b.to_edge_matrix(np.float64, condensed=True)
+    return np.sqrt(np.sum(np.square(a - b)) / np.sum(np.square(a)))
 
 
 def _recover_local(original: NDArray, reconstructed: NDArray) -> NDArray:
@@ -84,6 +81,8 @@ def do_mds(tsp: N_TSP, dimensions: int = 2) -> Tuple[N_TSP, N_TSP, float]:
     Returns:
         Tuple[N_TSP, N_TSP, float]: (original problem, reconstructed problem, stress-1)
     """
+    from sklearn.manifold import MDS  # pylint: disable=import-outside-toplevel
+
     mds = MDS(n_components=dimensions, metric=True, dissimilarity='precomputed')
     V = mds.fit_transform(tsp.to_edge_matrix())
     if dimensions == 2 and tsp.dimensions == 2:
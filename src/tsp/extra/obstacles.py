@@ -7,7 +7,15 @@ nothing to do with "non-Euclidean geometry" proper, we have taken to calling it
 problem rather than a *non*-Euclidean problem.
 
 Note that the generated edge matrix from a `TSP_O` object will use the shortest paths found using
-the visibility graph and Dijkstra's algorithm implemented in `tsp.extra.visgraph`.
+the visibility graph and Dijkstra's algorithm implemented in `tsp.extra.visgraph`. The shortest paths
+from each city to all of the others are found in a single run of Dijkstra's algorithm, and the paths
+are kept along with the edge matrix, for drawing tours (`TSP_O.tour_segments`). For large problems,
+the runs can be spread across processes with `TSP_O.compute_shortest_paths`.
+
+Once the visibility graph and the edge matrix have been generated, adding an obstacle or a city
+updates them rather than generating them again: the graph only loses the edges the obstacle blocks,
+and gains edges from the new points, and the shortest paths are only found again from cities whose
+paths may have changed (the ones using a blocked edge, or which a new point could shorten).
 
 If you are interested in generating TSP-Os with more complex obstacles made from a bunch of
 line segments arranged in some kind of template, the code for that can be found in
@@ -15,14 +23,13 @@ line segments arranged in some kind of template, the code for that can be found
 """
 
 
-from typing import Iterable, Iterator, DefaultDict, Tuple
-import itertools as it
-from numpy.typing import NDArray
+from typing import Iterable, Iterator, List, Tuple
+from numpy.typing import DTypeLike, NDArray
 import numpy.random as random
 import numpy as np
 
-from tsp.core.tsp import TSP, distance
-from tsp.extra.visgraph import calculate_visgraph, shortest_path
+from tsp.core.tsp import TSP
+from tsp.extra.visgraph import VisGraph, all_pairs_shortest_paths, calculate_visgraph, path_from_predecessors
 from tsp.extra.templates import Template
 
 
@@ -64,9 +71,9 @@ class TSP_O(TSP):
         Returns:
             bool: whether city can be safely added
         """
-        for p in cities:
-            if np.linalg.norm(p - np.array([x, y])) < r:
-                return False
+        cities = np.asarray(cities)
+        if len(cities) and np.min(np.linalg.norm(cities - np.array([x, y]), axis=1)) < r:
+            return False
         for L in obstacles:
             assert len(L) == 2
             if _point_to_line((x, y), L) < min_dist:
@@ -98,7 +105,6 @@ class TSP_O(TSP):
                     continue
                 result.add_city(x, y)
             try:
-                result.vg = None
                 result.to_edge_matrix()
             except Exception:
                 continue
@@ -109,33 +115,138 @@ class TSP_O(TSP):
         TSP.__init__(self, w, h)
         self.obstacles = np.array([])  # list of "polygons" i.e. lists of two-tuple vertices
         self.vg = None
-        self.E = None
+        self._vg_version = None
+        self._paths = None
+        self._paths_version = None
+
+    @property
+    def E(self) -> NDArray:
+        """Edge matrix of shortest path lengths (in double precision), if it has been generated.
+
+        Returns:
+            NDArray: edge matrix, or None
+        """
+        return self.edge_cache.peek(self.version, np.float64)
 
     def add_obstacle(self, *vertices: Tuple[int]):
-        """Inefficiently add obstacles to the problem.
+        """Inefficiently add obstacles to the problem. The visibility graph and the edge matrix are
+        updated if they are up to date (see `_update`).
 
         Args:
             vertices Tuple[int]: obstacle vertices as [x1, y1], ...
         """
+        graph, paths = self._up_to_date()
+        obstacle = np.array([tuple(int(i) for i in v) for v in vertices])
         self.obstacles = list(self.obstacles)
-        self.obstacles.append(np.array([tuple(int(i) for i in v) for v in vertices]))
+        self.obstacles.append(obstacle)
         self.obstacles = np.array(self.obstacles)
+        self.invalidate()
+        if graph is not None:
+            self._update(graph, paths, graph.add_obstacle(obstacle, self.obstacles, bound=(self.w, self.h)))
+
+    def add_cities(self, cities: NDArray):
+        """Adds a batch of cities to the problem at once. The visibility graph and the edge matrix are
+        updated if they are up to date (see `_update`).
+
+        Args:
+            cities (NDArray): cities as [[x1, y1], ...]
+        """
+        graph, paths = self._up_to_date()
+        n = len(self.cities)
+        TSP.add_cities(self, cities)
+        if graph is not None and len(self.cities) > n:
+            graph.add_points(list(map(tuple, self.cities[n:])), self.obstacles, bound=(self.w, self.h))
+            self._update(graph, paths)
+
+    def _up_to_date(self) -> Tuple[VisGraph, tuple]:
+        # The visibility graph, and the edge matrix with the shortest paths, if they are up to date
+        graph = self.vg if self.vg is not None and self._vg_version == self.version else None
+        E = self.E
+        if graph is None or E is None or self._paths_version != self.version:
+            return graph, None
+        return graph, (E, self._paths)
+
+    def _update(self, graph: VisGraph, paths: tuple, blocked: Tuple[NDArray, NDArray] = None):
+        """Keep a visibility graph which has been updated for the latest change to the problem, and
+        update the edge matrix and shortest paths, if they were up to date before the change.
+
+        Each row of the edge matrix below the diagonal comes from a single run of Dijkstra's algorithm
+        (see `_shortest_paths`). Rows are only found again if one of those paths uses an edge blocked
+        by a new obstacle, or could be shortened by going through a new point of the graph (such as a
+        new city), which is checked with a run from each new point. Rows for new cities are always
+        found. The points of the graph keep their numbers, and new points are numbered after them.
 
-    def to_visgraph(self, rebuild: bool = False) -> DefaultDict:
+        Args:
+            graph (VisGraph): updated visibility graph
+            paths (tuple): edge matrix and shortest paths from before the change, or None
+            blocked (Tuple[NDArray, NDArray], optional): Edges of the graph blocked by a new obstacle
+                (see `tsp.extra.visgraph.VisGraph.add_obstacle`). Defaults to None.
+        """
+        self._vg_version = self.version
+        if paths is None:
+            return
+        from scipy.sparse.csgraph import dijkstra  # pylint: disable=import-outside-toplevel
+        E_old, (vertices, predecessors, columns) = paths
+        old, known, n = len(columns), len(vertices), len(self.cities)
+        cities = list(map(tuple, self.cities))
+        vertices, matrix = graph.to_csr(vertices + cities[old:])
+        index = {p: i for i, p in enumerate(vertices)}
+        columns = np.array([index[p] for p in cities], dtype=np.int64).reshape(-1)
+        stale = np.arange(n) >= old
+        if blocked is not None and len(blocked[0]):
+            # Mark each point whose path from a city comes through a blocked edge, then every point
+            # after it on the path (following predecessors, doubling the distance each time)
+            ids = np.array([index[p] for p in graph.points()], dtype=np.int64)
+            a, b = ids[blocked[0]], ids[blocked[1]]
+            points = np.arange(known)
+            parent = np.where(predecessors >= 0, predecessors, points).astype(np.int64)
+            marked = np.isin(parent * known + points, np.concatenate([a * known + b, b * known + a]))
+            while True:
+                marked |= np.take_along_axis(marked, parent, axis=1)
+                ancestor = np.take_along_axis(parent, parent, axis=1)
+                if (ancestor == parent).all():
+                    break
+                parent = ancestor
+            stale[:old] |= np.tril(marked[:, columns[:old]], -1).any(axis=1)
+        if len(vertices) > known:
+            lengths = dijkstra(matrix, indices=np.arange(known, len(vertices)))[:, columns[:old]]
+            for row in lengths:
+                stale[:old] |= np.tril(row[:, None] + row[None, :] < E_old, -1).any(axis=1)
+        rows = np.flatnonzero(stale)
+        predecessors = np.pad(predecessors, ((0, n - old), (0, len(vertices) - known)), constant_values=-9999)
+        E = np.zeros((n, n))
+        E[:old, :old] = E_old
+        if len(rows):
+            lengths, found = dijkstra(matrix, indices=columns[rows], return_predecessors=True)
+            predecessors[rows] = found
+            for r, row in zip(rows.tolist(), lengths[:, columns]):
+                E[r, :r] = E[:r, r] = row[:r]
+        if np.isinf(E).any():
+            self.edge_cache.clear()  # generated (and the missing path reported) when next needed
+            return
+        self._paths = (vertices, predecessors, columns)
+        self._paths_version = self.version
+        self.edge_cache.get(self.version, lambda: E, np.float64)
+
+    def to_visgraph(self, rebuild: bool = False) -> VisGraph:
         """Generate and return a visibility graph for the problem.
 
+        The graph is rebuilt automatically if the problem has been modified since it was generated.
+
         Args:
             rebuild (bool, optional): Whether or not to rebuild from scratch. Defaults to False.
 
         Returns:
-            DefaultDict: visibility graph
+            VisGraph: visibility graph
         """
-        if self.vg is None or rebuild:
+        if self.vg is None or rebuild or self._vg_version != self.version:
             self.vg = calculate_visgraph(self.cities, self.obstacles, bound=(self.w, self.h))
+            self._vg_version = self.version
         return self.vg
 
     def edge(self, a: int, b: int) -> float:
-        """Calculate shortest path between two cities.
+        """Calculate shortest path between two cities (looked up from the edge matrix, which is
+        generated if necessary).
 
         Args:
             a (int): index of first city
@@ -144,30 +255,67 @@ class TSP_O(TSP):
         Returns:
             float: edge length
         """
-        g = self.to_visgraph()
-        A, B = self.cities[a], self.cities[b]
-        return distance(shortest_path(A, B, g))
+        return float(self.edge_batch(a, b))
+
+    def _shortest_paths(self, workers: int = None) -> NDArray:
+        cities = list(map(tuple, self.cities))
+        vertices, lengths, predecessors = all_pairs_shortest_paths(cities, self.to_visgraph(), workers)
+        index = {p: i for i, p in enumerate(vertices)}
+        columns = np.array([index[p] for p in cities], dtype=np.int64).reshape(-1)
+        E = lengths[:, columns]
+        unreachable = np.argwhere(np.isinf(E))
+        if len(unreachable):
+            raise ValueError('no path between cities {} and {}'.format(*unreachable[0]))
+        self._paths = (vertices, predecessors, columns)
+        self._paths_version = self.version
+        lower = np.tril(E, -1)
+        return lower + lower.T  # exactly symmetric, each edge from the run of Dijkstra's from the later city
+
+    def _build_edge_matrix(self, dtype: DTypeLike, condensed: bool, chunk_size: int) -> NDArray:
+        # The shortest paths from each city are found all at once, so always build the most precise
+        # form and derive the rest
+        return self._shortest_paths()
+
+    def compute_shortest_paths(self, workers: int = None) -> NDArray:
+        """Find the shortest paths between all pairs of cities, running Dijkstra's algorithm once from
+        each city (see `tsp.extra.visgraph.all_pairs_shortest_paths`). Their lengths are kept as the
+        edge matrix (see `E`), and the paths themselves are kept for `tour_segments`. This happens
+        automatically, in a single process, when the edge matrix is first needed; call this first to
+        spread the work across processes instead.
 
-    def to_edges(self) -> Iterable[Tuple[int, int, float]]:
-        """Produces iterable of edges (a, b, d) of distance d between vertices a and b.
+        Args:
+            workers (int, optional): Number of processes to use. Defaults to None (a single process).
 
-        Yields:
-            Iterator[int, int, float]: edges
+        Raises:
+            ValueError: if some pair of cities has no path between them
+
+        Returns:
+            NDArray: edge matrix (in double precision)
         """
-        g = self.to_visgraph()
-        for a, b in it.combinations(range(len(self.cities)), 2):
-            A, B = self.cities[a], self.cities[b]
-            yield a, b, distance(shortest_path(A, B, g))
+        return self.edge_cache.get(self.version, lambda: self._shortest_paths(workers), np.float64)
+
+    def _path(self, a: int, b: int) -> List[Tuple[int, int]]:
+        if self._paths_version != self.version:
+            self.edge_cache.clear()
+            self.compute_shortest_paths()
+        vertices, predecessors, columns = self._paths
+        # As in the edge matrix, follow the path found from the later city
+        later, other = max(a, b), min(a, b)
+        path = path_from_predecessors(predecessors[later], vertices, columns[later], columns[other])
+        return path if later == a else path[::-1]
+
+    def edge_batch(self, a: NDArray, b: NDArray) -> NDArray:
+        """Vectorized shortest path lengths between cities a[i] and b[i], looked up from the edge
+        matrix (which is generated if necessary).
 
-    def to_edge_matrix(self) -> NDArray:
-        """Generate an edge matrix from the problem.
+        Args:
+            a (NDArray): indices of first cities
+            b (NDArray): indices of second cities
 
         Returns:
-            NDArray: edge matrix
+            NDArray: edge lengths
         """
-        if self.E is None:
-            self.E = TSP.to_edge_matrix(self)
-        return self.E
+        return self.to_edge_matrix(np.float64)[a, b]
 
     def tour_segments(self, tour: Iterable[int]) -> Iterator[NDArray]:
         """Produces iterator of vertices (x, y) that, when connected, make up the tour in obstacle space.
@@ -178,29 +326,17 @@ class TSP_O(TSP):
         Yields:
             Iterator[NDArray]: tour as coordinates of line segments
         """
-        g = self.to_visgraph()
         prev = None
         first = None
         for c in tour:
             if prev is None:
-                prev = self.cities[c]
-                first = prev
-                yield prev
+                prev = c
+                first = c
+                yield self.cities[c]
                 continue
-            A, B = prev, self.cities[c]
-            _ = False
-            for p in shortest_path(A, B, g):
-                if _:
-                    yield p
-                else:
-                    _ = True  # Discard the first point so there are no duplicates
-            prev = B
-        _ = False
-        for p in shortest_path(prev, first, g):
-            if _:
-                yield p
-            else:
-                _ = True
+            yield from self._path(prev, c)[1:]  # Discard the first point so there are no duplicates
+            prev = c
+        yield from self._path(prev, first)[1:]
 
     # Helper methods for making obstacles
 
@@ -227,7 +363,6 @@ class TSP_O(TSP):
         """
         for _ in range(n):
             self.add_random_obstacle(edge_length)
-        self.to_visgraph(True)
 
     def add_random_obstacles_from_template(self, template: Template, n: int = 1, start_offsets = (0, 0)):
         """Add obstacles using a template.
@@ -243,4 +378,3 @@ class TSP_O(TSP):
                 (start_offsets[0], self.w - start_offsets[0]),
                 (start_offsets[1], self.h - start_offsets[1])
             )
-        self.to_visgraph(True)
@@ -1,11 +1,39 @@
 """Visibility graph (assumes obstacles as straight line segments) and Dijkstra's implementation.
+
+`calculate_visgraph` tests whether each pair of points can see each other with NumPy, testing one
+point against all of the points after it and all of the obstacles at once, so only O(V) steps are
+interpreted (rather than O(V² O)), and obstacle-heavy problems build quickly.
+
+The graph is kept as a `VisGraph`: the distinct points are numbered, their coordinates kept in an
+array, and the points visible from each point kept as a sparse (CSR) adjacency structure along with
+the distances to them, which takes a fraction of the memory of a dictionary of lists of tuples and
+can be handed straight to SciPy. A `VisGraph` can still be used as a (read-only) dictionary of the
+points visible from each point, and the procedures of this module accept either.
+
+`shortest_path` finds the shortest path between a single pair of points, with Dijkstra's algorithm
+(keeping a distance label and predecessor for each point on a binary heap), or with A* search guided
+by the straight-line distance to the end point. To find the shortest paths between many pairs,
+`all_pairs_shortest_paths` converts the graph into a sparse adjacency matrix (see `to_csr`) and runs
+Dijkstra's algorithm (`scipy.sparse.csgraph.dijkstra`) once from each source, which finds the shortest
+paths to all other points at once, optionally running sources in parallel across processes. The paths
+themselves can then be read off the predecessor table it produces with `path_from_predecessors`.
 """
 
 
-from typing import DefaultDict, List, Tuple
+from typing import TYPE_CHECKING, Callable, DefaultDict, Dict, Iterator, List, Tuple, Union
 import itertools as it
 from collections import defaultdict
-from queue import PriorityQueue
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+import heapq
+import math
+from queue import Empty
+
+from numpy.typing import NDArray
+import numpy as np
+
+if TYPE_CHECKING:
+    from scipy.sparse import csr_matrix
 
 
 Point = Tuple[int, int]
@@ -13,49 +41,303 @@ Line = Tuple[Point, Point]
 Graph = DefaultDict[Point, List[Point]]
 
 
-def _on_segment(p: Point, q: Point, r: Point) -> bool:
-    return q[0] <= max(p[0], r[0]) and q[0] >= min(p[0], r[0]) and q[1] <= max(p[1], r[1]) and q[1] >= min(p[1], r[1])
+# The geometric predicates below are vectorized: points are arrays whose last axis holds (x, y), and
+# the other axes are broadcast against each other.
+
+def _on_segment(p: NDArray, q: NDArray, r: NDArray) -> NDArray:
+    return ((q[..., 0] <= np.maximum(p[..., 0], r[..., 0])) & (q[..., 0] >= np.minimum(p[..., 0], r[..., 0])) &
+            (q[..., 1] <= np.maximum(p[..., 1], r[..., 1])) & (q[..., 1] >= np.minimum(p[..., 1], r[..., 1])))
 
 
-def _orientation(p: Point, q: Point, r: Point) -> int:
-    val = (q[1] - p[1]) * (r[0] - q[0]) - (q[0] - p[0]) * (r[1] - q[1])
-    if val == 0:
-        return 0  # colinear
-    if val > 0:
-        return 1  # clockwise
-    return 2  # counterclockwise
+def _orientation(p: NDArray, q: NDArray, r: NDArray) -> NDArray:
+    val = (q[..., 1] - p[..., 1]) * (r[..., 0] - q[..., 0]) - (q[..., 0] - p[..., 0]) * (r[..., 1] - q[..., 1])
+    return np.sign(val)  # 0 colinear, 1 clockwise, -1 counterclockwise
 
 
-def _intersect(p1: Point, q1: Point, p2: Point, q2: Point) -> bool:
+def _intersect(p1: NDArray, q1: NDArray, p2: NDArray, q2: NDArray) -> NDArray:
     """Does p1q1 intersect p2q2?"""
     o1 = _orientation(p1, q1, p2)
     o2 = _orientation(p1, q1, q2)
     o3 = _orientation(p2, q2, p1)
     o4 = _orientation(p2, q2, q1)
-    if o1 != o2 and o3 != o4:
-        return True
-    if o1 == 0 and _on_segment(p1, p2, q1):
-        return True
-    if o2 == 0 and _on_segment(p1, q2, q1):
-        return True
-    if o3 == 0 and _on_segment(p2, p1, q2):
-        return True
-    if o4 == 0 and _on_segment(p2, q1, q2):
-        return True
-    return False
-
-
-def _visible(a: Point, b: Point, obstacles: List[Line]):
-    for c, d in obstacles:
-        c, d = tuple(c), tuple(d)
-        if a == c or a == d or b == c or b == d:
-            continue  # If one of the points is a vertex of the obstacle, it's visible
-        if _intersect(a, b, c, d):
-            return False
-    return True
-
-
-def calculate_visgraph(vertices: List[Point], obstacles: List[Line], bound: Tuple[int, int] = None) -> Graph:
+    return (((o1 != o2) & (o3 != o4)) |
+            ((o1 == 0) & _on_segment(p1, p2, q1)) |
+            ((o2 == 0) & _on_segment(p1, q2, q1)) |
+            ((o3 == 0) & _on_segment(p2, p1, q2)) |
+            ((o4 == 0) & _on_segment(p2, q1, q2)))
+
+
+def _visible(a: NDArray, b: NDArray, obstacles: NDArray) -> NDArray:
+    # Which of the pairs of points a and b (broadcast, e.g. one point and many) can see each other,
+    # testing all of them against all of the obstacles (shape (k, 2, 2)) at once
+    a, b = a[..., None, :], b[..., None, :]
+    c, d = obstacles[:, 0], obstacles[:, 1]
+    # If one of the points is a vertex of the obstacle, it's visible
+    shared = (a == c).all(-1) | (a == d).all(-1) | (b == c).all(-1) | (b == d).all(-1)
+    return ~(_intersect(a, b, c, d) & ~shared).any(axis=-1)
+
+
+def _segments(obstacles: List[Line]) -> NDArray:
+    return np.array([[tuple(c), tuple(d)] for c, d in obstacles]).reshape(-1, 2, 2)
+
+
+def _bounded(points: List[Point], bound: Tuple[int, int]) -> List[Point]:
+    if bound is None:
+        return points
+    # We expect bound to take the form (x_max, y_max)
+    # This prevents the graph from taking into account paths that would go outside the bound
+    # Implicitly, if there is a bound specified, we also take x_min == y_min == 0
+    return [p for p in points if p[0] <= bound[0] and p[1] <= bound[1] and p[0] >= 0 and p[1] >= 0]
+
+
+class VisGraph(Mapping):
+    """Compact visibility graph: distinct points numbered from 0, their coordinates, and the points
+    visible from each point as a sparse (CSR) adjacency structure, with the distances between them.
+
+    It can also be used as a read-only table of the points visible (value) from any given point (key),
+    like the dictionaries `calculate_visgraph` used to return. Unlike those, it has no default value:
+    use `get` for points which may not be in the graph.
+
+    Attributes:
+        coords (NDArray): coordinates of the points (points x 2)
+        indptr (NDArray): the points visible from point i are indices[indptr[i]:indptr[i + 1]]
+        indices (NDArray): points visible from each point, in increasing order
+        weights (NDArray): distance between each point and each of the points visible from it
+    """
+
+    def __init__(self, coords: NDArray, indptr: NDArray, indices: NDArray, weights: NDArray):
+        """
+        Args:
+            coords (NDArray): coordinates of the points
+            indptr (NDArray): offset of the visible points of each point in indices (points + 1)
+            indices (NDArray): points visible from each point
+            weights (NDArray): distances to the points visible from each point
+        """
+        self.coords = coords
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self._points = None
+        self._index = None
+
+    @classmethod
+    def from_edges(cls, coords: NDArray, a: NDArray, b: NDArray) -> 'VisGraph':
+        """Build a graph from pairs of points which can see each other.
+
+        Args:
+            coords (NDArray): coordinates of the (distinct) points
+            a (NDArray): first point of each pair
+            b (NDArray): second point of each pair
+
+        Returns:
+            VisGraph: graph
+        """
+        n = len(coords)
+        a, b = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+        # Both directions of each pair, numbered so that sorting orders them by row, then column
+        keys = np.unique(np.concatenate([a * n + b, b * n + a]))
+        rows, cols = keys // n, keys % n
+        keep = rows != cols
+        rows, cols = rows[keep], cols[keep]
+        points = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        weights = np.linalg.norm(points[rows] - points[cols], axis=1)
+        dtype = np.int32 if max(n, len(cols)) < 2 ** 31 else np.int64
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n))]).astype(dtype)
+        return cls(np.asarray(coords).reshape(-1, 2), indptr, cols.astype(dtype), weights)
+
+    @classmethod
+    def from_dict(cls, graph: Graph) -> 'VisGraph':
+        """Convert a table of the points visible from each point.
+
+        Args:
+            graph (Graph): table of all vertices visible (value) from any given vertex (key)
+
+        Returns:
+            VisGraph: graph
+        """
+        index: Dict[Point, int] = {}
+        rows, cols = [], []
+        for p, visible in graph.items():
+            i = index.setdefault(tuple(p), len(index))
+            for q in visible:
+                rows.append(i)
+                cols.append(index.setdefault(tuple(q), len(index)))
+        return cls.from_edges(np.array(list(index)).reshape(-1, 2), np.array(rows, dtype=np.int64),
+                              np.array(cols, dtype=np.int64))
+
+    def _lookup(self) -> Dict[Point, int]:
+        if self._index is None:
+            self._points = list(map(tuple, self.coords.tolist()))
+            self._index = {p: i for i, p in enumerate(self._points)}
+        return self._index
+
+    @property
+    def nbytes(self) -> int:
+        """Memory taken up by the arrays of the graph.
+
+        Returns:
+            int: bytes
+        """
+        return self.coords.nbytes + self.indptr.nbytes + self.indices.nbytes + self.weights.nbytes
+
+    def index(self, point: Point) -> int:
+        """Look up the number of a point.
+
+        Args:
+            point (Point): point of the graph
+
+        Raises:
+            KeyError: if the point is not in the graph
+
+        Returns:
+            int: number of the point
+        """
+        return self._lookup()[tuple(point)]
+
+    def points(self) -> List[Point]:
+        """Points of the graph, in order, as tuples of Python numbers.
+
+        Returns:
+            List[Point]: points
+        """
+        self._lookup()
+        return self._points
+
+    def neighbors(self, i: int) -> NDArray:
+        """Numbers of the points visible from a point.
+
+        Args:
+            i (int): number of the point
+
+        Returns:
+            NDArray: numbers of the visible points, in increasing order
+        """
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def distances(self, i: int) -> NDArray:
+        """Distances from a point to the points visible from it (in the order of `neighbors`).
+
+        Args:
+            i (int): number of the point
+
+        Returns:
+            NDArray: distances
+        """
+        return self.weights[self.indptr[i]:self.indptr[i + 1]]
+
+    def edges(self) -> Tuple[NDArray, NDArray]:
+        """Pairs of points which can see each other, each pair once.
+
+        Returns:
+            Tuple[NDArray, NDArray]: first points (in increasing order) and second points of the pairs
+                (each greater than the first)
+        """
+        a = np.repeat(np.arange(len(self.coords)), np.diff(self.indptr))
+        keep = a < self.indices
+        return a[keep], self.indices[keep]
+
+    def _extend(self, points: List[Point], segments: NDArray, a: NDArray, b: NDArray):
+        # Keep the edges a[i] - b[i], and add the points which are not in the graph yet, after the
+        # others (so that the numbers of the points already in the graph don't change)
+        index = self._lookup()
+        new = [p for p in dict.fromkeys(map(tuple, points)) if p not in index]
+        coords = np.concatenate([self.coords, np.array(new).reshape(-1, 2)]) if len(self.coords) else \
+            np.array(new).reshape(-1, 2)
+        a, b = [a], [b]
+        for i in range(len(self.coords), len(coords)):
+            visible = np.flatnonzero(_visible(coords[i], coords[:i], segments))
+            a.append(visible)
+            b.append(np.full(len(visible), i))
+        graph = VisGraph.from_edges(coords, np.concatenate(a), np.concatenate(b))
+        self.coords, self.indptr, self.indices, self.weights = graph.coords, graph.indptr, graph.indices, graph.weights
+        self._points = self._index = None
+
+    def add_points(self, points: List[Point], obstacles: List[Line], bound: Tuple[int, int] = None):
+        """Add points to the graph (e.g. new cities), only testing what is visible from them. Points
+        already in the graph are left alone, and new points are numbered after the others.
+
+        Args:
+            points (List[Point]): points to add
+            obstacles (List[Line]): all of the obstacles
+            bound (Tuple[int, int], optional): Maximum x and y (excludes points outside of this, as in
+                `calculate_visgraph`). Defaults to None.
+        """
+        a, b = self.edges()
+        self._extend(_bounded(list(map(tuple, points)), bound), _segments(obstacles), a, b)
+
+    def add_obstacle(self, obstacle: Line, obstacles: List[Line], bound: Tuple[int, int] = None) -> Tuple[NDArray, NDArray]:
+        """Update the graph for a new obstacle: remove the edges it blocks, and add its endpoints (only
+        testing what is visible from them). Other edges can't be affected, so the result is the same
+        as calculating the graph again from scratch.
+
+        Args:
+            obstacle (Line): new obstacle
+            obstacles (List[Line]): all of the obstacles, including the new one
+            bound (Tuple[int, int], optional): Maximum x and y (excludes points outside of this, as in
+                `calculate_visgraph`). Defaults to None.
+
+        Returns:
+            Tuple[NDArray, NDArray]: pairs of points which could see each other before, but are
+                blocked by the new obstacle (as in `edges`)
+        """
+        a, b = self.edges()
+        blocked = ~_visible(self.coords[a], self.coords[b], _segments([obstacle]))
+        self._extend(_bounded(list(map(tuple, obstacle)), bound), _segments(obstacles), a[~blocked], b[~blocked])
+        return a[blocked], b[blocked]
+
+    def to_csr(self, points: List[Point] = None) -> Tuple[List[Point], 'csr_matrix']:
+        """Sparse adjacency matrix of the graph, weighted by the distances between points.
+
+        Args:
+            points (List[Point], optional): Points to number first, in order (whether or not they are
+                in the graph). Defaults to None (keep the numbering of the graph).
+
+        Returns:
+            Tuple[List[Point], csr_matrix]: points, in the order of the rows of the matrix, and matrix
+        """
+        from scipy.sparse import csr_matrix  # pylint: disable=import-outside-toplevel
+        n = len(self.coords)
+        if points is None:
+            return list(self.points()), csr_matrix((self.weights, self.indices, self.indptr), shape=(n, n))
+        index = self._lookup()
+        first: Dict[Point, int] = {}
+        for p in map(tuple, points):
+            first.setdefault(p, len(first))
+        # Points which are not in the graph are added without any visible points
+        extra = {p: n + k for k, p in enumerate(p for p in first if p not in index)}
+        m = n + len(extra)
+        indptr = np.concatenate([self.indptr, np.full(len(extra), self.indptr[-1], dtype=self.indptr.dtype)])
+        matrix = csr_matrix((self.weights, self.indices, indptr), shape=(m, m))
+        order = np.array([index[p] if p in index else extra[p] for p in first], dtype=np.int64)
+        rest = np.ones(m, dtype=bool)
+        rest[order] = False
+        order = np.concatenate([order, np.flatnonzero(rest)])
+        vertices = self.points() + list(extra)
+        return [vertices[i] for i in order.tolist()], matrix[order][:, order]
+
+    def __getitem__(self, point: Point) -> List[Point]:
+        points = self.points()
+        return [points[j] for j in self.neighbors(self.index(point)).tolist()]
+
+    def __contains__(self, point) -> bool:
+        return tuple(point) in self._lookup()
+
+    def __iter__(self) -> Iterator[Point]:
+        return iter(self.points())
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    def to_dict(self) -> Graph:
+        """Convert the graph into a table of the points visible from each point.
+
+        Returns:
+            Graph: table of all vertices visible (value) from any given vertex (key)
+        """
+        return defaultdict(list, self.items())
+
+
+def calculate_visgraph(vertices: List[Point], obstacles: List[Line], bound: Tuple[int, int] = None) -> VisGraph:
     """Calculate a visibility graph. Obstacle endpoints are included in the graph.
 
     Args:
@@ -64,53 +346,170 @@ def calculate_visgraph(vertices: List[Point], obstacles: List[Line], bound: Tupl
         bound (Tuple[int, int], optional): Maximum x and y (excludes vertices and obstacle endpoints outside of this). Defaults to None.
 
     Returns:
-        Graph: table of all vertices visible (value) from any given vertex (key)
+        VisGraph: visibility graph
     """
     # Obstacles should only be line segments at this point
-    result = defaultdict(list)
-    points = list(map(tuple, vertices)) + list(map(tuple, it.chain(*obstacles)))
-    if bound is not None:
-        # We expect bound to take the form (x_max, y_max)
-        # This prevents the graph from taking into account paths that would go outside the bound
-        # Implicitly, if there is a bound specified, we also take x_min == y_min == 0
-        points = [p for p in points if p[0] <= bound[0] and p[1] <= bound[1] and p[0] >= 0 and p[1] >= 0]
-    for a, b in it.combinations(points, 2):
-        if _visible(a, b, obstacles):
-            result[tuple(a)].append(tuple(b))
-            result[tuple(b)].append(tuple(a))
-    return result
+    points = _bounded(list(map(tuple, vertices)) + list(map(tuple, it.chain(*obstacles))), bound)
+    coords = np.array(list(dict.fromkeys(points))).reshape(-1, 2)
+    segments = _segments(obstacles)
+    a, b = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    for i in range(len(coords) - 1):
+        visible = i + 1 + np.flatnonzero(_visible(coords[i], coords[i + 1:], segments))
+        a.append(np.full(len(visible), i))
+        b.append(visible)
+    return VisGraph.from_edges(coords, np.concatenate(a), np.concatenate(b))
 
 
 def _distance(p: Point, q: Point) -> float:
-    return pow(pow(p[0] - q[0], 2) + pow(p[1] - q[1], 2), 0.5)
+    return math.hypot(p[0] - q[0], p[1] - q[1])
+
 
+def _search(a, b, neighbors: Callable, closed: set, heuristic: Callable = None) -> list:
+    # Dijkstra's algorithm (or A*, given a heuristic) from a to b, given the neighbors of each point
+    # with the distances to them
+    lengths = {a: 0.}
+    previous = {a: None}
+    heap = [(heuristic(a) if heuristic else 0., a)]
+    while heap:
+        _, p = heapq.heappop(heap)
+        if p == b:
+            path = [b]
+            while previous[path[-1]] is not None:
+                path.append(previous[path[-1]])
+            return path[::-1]
+        if p in closed:
+            continue
+        closed.add(p)
+        for q, distance in neighbors(p):
+            if q in closed:
+                continue
+            length = lengths[p] + distance
+            if length < lengths.get(q, float('inf')):
+                lengths[q] = length
+                previous[q] = p
+                heapq.heappush(heap, (length + heuristic(q) if heuristic else length, q))
+    return None
 
-def shortest_path(a: Point, b: Point, graph: Graph, exclude: List[Point] = None) -> List[Point]:
+
+def shortest_path(a: Point, b: Point, graph: Union[Graph, VisGraph], exclude: List[Point] = None,
+                  astar: bool = False) -> List[Point]:
     """Shortest path (calculated with Dijkstra's) between points a and b in the visibility graph,
     taking into account navigation around obstacles.
 
     Args:
         a (Point): starting point
         b (Point): end point
-        graph (Graph): visibility graph (must contain a and b)
+        graph (Union[Graph, VisGraph]): visibility graph (must contain a and b)
         exclude (List[Point], optional): Points in the graph which cannot be on the path. Defaults to None.
+        astar (bool, optional): Whether to search with A* instead, guided by the straight-line distance
+            to b (which finds the same length of path, usually exploring far fewer points). Defaults to False.
+
+    Raises:
+        Empty: if there is no path
 
     Returns:
         List[Point]: shortest path from a to b
     """
     a, b = tuple(a), tuple(b)
-    q = PriorityQueue()
-    visited = set() if exclude is None else set(exclude)
-    visited.discard(a)
-    visited.discard(b)
-    current = [a]
-    score = 0
-    while True:
-        if current[-1] == b:
-            return current
-        if current[-1] not in visited:
-            visited.add(current[-1])
-            for p in graph[current[-1]]:
-                if p not in visited:
-                    q.put((_distance(current[-1], p) + score, current + [p]))
-        score, current = q.get(False)  # This will raise an Empty exception if there is no path
+    closed = set() if exclude is None else set(map(tuple, exclude))
+    closed.discard(a)
+    closed.discard(b)
+    if a == b:
+        path = [a]
+    elif isinstance(graph, VisGraph):
+        # Search by number, with the distances stored in the graph
+        path = None
+        if a in graph and b in graph:
+            points, target = graph.points(), graph.index(b)
+            path = _search(
+                graph.index(a), target,
+                lambda i: zip(graph.neighbors(i).tolist(), graph.distances(i).tolist()),
+                {graph.index(p) for p in closed if p in graph},
+                (lambda i: _distance(points[i], points[target])) if astar else None
+            )
+            path = None if path is None else [points[i] for i in path]
+    else:
+        path = _search(a, b, lambda p: ((q, _distance(p, q)) for q in graph.get(p, ())), closed,
+                       (lambda p: _distance(p, b)) if astar else None)
+    if path is None:
+        raise Empty(f'no path from {a} to {b}')
+    return path
+
+
+def to_csr(graph: Union[Graph, VisGraph], points: List[Point] = None) -> Tuple[List[Point], 'csr_matrix']:
+    """Convert a visibility graph into a sparse adjacency matrix, weighted by the distances between
+    points (see `VisGraph.to_csr`).
+
+    Args:
+        graph (Union[Graph, VisGraph]): visibility graph
+        points (List[Point], optional): Points to number first, in order (whether or not they are in
+            the graph). Defaults to None.
+
+    Returns:
+        Tuple[List[Point], csr_matrix]: points, in the order of the rows of the matrix, and matrix
+    """
+    if not isinstance(graph, VisGraph):
+        graph = VisGraph.from_dict(graph)
+    return graph.to_csr(points)
+
+
+def _dijkstra(matrix: 'csr_matrix', sources: NDArray) -> Tuple[NDArray, NDArray]:
+    from scipy.sparse.csgraph import dijkstra  # pylint: disable=import-outside-toplevel
+    return dijkstra(matrix, indices=sources, return_predecessors=True)
+
+
+def all_pairs_shortest_paths(sources: List[Point], graph: Union[Graph, VisGraph],
+                             workers: int = None) -> Tuple[List[Point], NDArray, NDArray]:
+    """Lengths of the shortest paths from each source to every point in the visibility graph, running
+    Dijkstra's algorithm once per source.
+
+    Args:
+        sources (List[Point]): starting points (the first points of the result, in order)
+        graph (Union[Graph, VisGraph]): visibility graph
+        workers (int, optional): Number of processes to run sources in. Defaults to None (all in this
+            process).
+
+    Returns:
+        Tuple[List[Point], NDArray, NDArray]: points of the graph (starting with the distinct sources,
+            in order), lengths (sources x points, infinite where there is no path), and predecessors
+            (sources x points, the index of the point before each point on the path from the source,
+            or a negative number for the source itself and unreachable points)
+    """
+    vertices, matrix = to_csr(graph, sources)
+    index = {p: i for i, p in enumerate(vertices)}
+    indices = np.array([index[tuple(p)] for p in sources], dtype=np.int64)
+    if workers is None or workers <= 1 or len(sources) < 2:
+        lengths, predecessors = _dijkstra(matrix, indices)
+    else:
+        chunks = np.array_split(indices, min(workers, len(sources)))
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(_dijkstra, [matrix] * len(chunks), chunks))
+        lengths = np.concatenate([r[0] for r in results])
+        predecessors = np.concatenate([r[1] for r in results])
+    return vertices, lengths.reshape(len(sources), -1), predecessors.reshape(len(sources), -1)
+
+
+def path_from_predecessors(predecessors: NDArray, vertices: List[Point], source: int, target: int) -> List[Point]:
+    """Read the shortest path between two points off the predecessors of a single source (a row of
+    the table produced by `all_pairs_shortest_paths`).
+
+    Args:
+        predecessors (NDArray): predecessors of the points on paths from the source
+        vertices (List[Point]): points of the graph
+        source (int): index of the starting point
+        target (int): index of the end point
+
+    Raises:
+        ValueError: if there is no path between the points
+
+    Returns:
+        List[Point]: shortest path from source to target
+    """
+    row = predecessors
+    path = [target]
+    while path[-1] != source:
+        previous = row[path[-1]]
+        if previous < 0:
+            raise ValueError(f'no path from {vertices[source]} to {vertices[target]}')
+        path.append(previous)
+    return [vertices[i] for i in reversed(path)]
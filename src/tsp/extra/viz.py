@@ -1,17 +1,20 @@
 """Procedures for visualizing TSP-Os and TSPs with color using the PIL and MatPlotLib backends.
+MatPlotLib is only imported when it is needed (see `tsp.core.viz`).
 """
 
 
-from typing import Iterable, Union
+from __future__ import annotations
+from typing import TYPE_CHECKING, Iterable, Union
 from numpy.typing import NDArray
 from PIL import Image, ImageDraw
-import matplotlib.pyplot as plt
-from matplotlib.axes import SubplotBase
 
 from tsp.core.viz import _draw_cities_pil, _draw_tour_pil, visualize_tsp_plt
 from tsp.extra.obstacles import TSP_O
 from tsp.extra.color import TSP_Color
 
+if TYPE_CHECKING:
+    from matplotlib.axes import SubplotBase
+
 
 def _draw_obstacles_pil(im: Image, tsp: TSP_O):
     draw = ImageDraw.Draw(im)
@@ -53,6 +56,7 @@ def visualize_obstacles_plt(tsp: TSP_O, tour: Iterable[Union[int, NDArray]], ax:
         ax (SubplotBase): Matplotlib axes to plot on. Defaults to None.
     """
     if ax is None:
+        import matplotlib.pyplot as plt  # pylint: disable=import-outside-toplevel
         ax = plt.subplot(111)
 
     visualize_tsp_plt(tsp, tour, ax)
@@ -0,0 +1,68 @@
+"""Tests for `tsp.core.concorde`, run against small shell scripts standing in for Concorde."""
+
+
+import os
+import stat
+import sys
+
+import numpy as np
+import pytest
+
+from tsp.core.concorde import ConcordeError, solve, solve_batch
+from tsp.core.tsp import TSP
+
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason='fake Concorde executables are shell scripts')
+
+CITIES = np.array([[0, 0], [10, 0], [10, 10], [0, 10], [5, 20]])
+
+
+def _fake_concorde(tmp_path, body: str) -> str:
+    # Concorde is called as `concorde -x -o <solution> [-s <seed>] <problem>`
+    path = tmp_path / 'concorde'
+    path.write_text('#!/bin/sh\n' + body + '\n')
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+def test_reads_and_rotates_the_tour(tmp_path):
+    executable = _fake_concorde(tmp_path, 'printf "5\\n2 3 4 0 1\\n" > "$3"')
+    tour = solve(TSP.from_cities(CITIES), executable=executable)
+    assert tour.tolist() == [0, 1, 2, 3, 4]
+
+
+def test_timeout(tmp_path):
+    executable = _fake_concorde(tmp_path, 'exec sleep 10')
+    with pytest.raises(ConcordeError, match='timed out'):
+        solve(TSP.from_cities(CITIES), timeout=0.2, executable=executable)
+
+
+def test_nonzero_exit(tmp_path):
+    executable = _fake_concorde(tmp_path, 'echo "no luck"\nexit 3')
+    with pytest.raises(ConcordeError, match=r'failed \(exit code 3\): no luck'):
+        solve(TSP.from_cities(CITIES), executable=executable)
+
+
+def test_missing_solution(tmp_path):
+    executable = _fake_concorde(tmp_path, 'exit 0')
+    with pytest.raises(ConcordeError, match='exit code 0'):
+        solve(TSP.from_cities(CITIES), executable=executable)
+
+
+def test_invalid_tour(tmp_path):
+    executable = _fake_concorde(tmp_path, 'printf "5\\n0 1 1 2 3\\n" > "$3"')
+    with pytest.raises(ConcordeError, match='invalid tour'):
+        solve(TSP.from_cities(CITIES), executable=executable)
+
+
+def test_missing_executable(tmp_path):
+    with pytest.raises(ConcordeError, match='cannot find'):
+        solve(TSP.from_cities(CITIES), executable=os.path.join(str(tmp_path), 'no-concorde'))
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_batch(tmp_path, workers):
+    executable = _fake_concorde(tmp_path, 'printf "5\\n4 3 2 1 0\\n" > "$3"')
+    problems = [TSP.from_cities(CITIES) for _ in range(4)]
+    tours = solve_batch(problems, workers=workers, executable=executable)
+    assert [t.tolist() for t in tours] == [[0, 4, 3, 2, 1]] * 4
@@ -0,0 +1,29 @@
+"""Regression tests for `tsp.core.pyramid`."""
+
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from tsp.core.pyramid import pyramid_solve
+from tsp.core.tsp import TSP
+
+
+with open(os.path.join(os.path.dirname(__file__), 'data', 'pyramid_baseline.json')) as f:
+    BASELINE = json.load(f)  # tours found by the original search over permutations
+
+
+@pytest.mark.parametrize('case', BASELINE, ids=lambda c: f"seed{c['seed']}-n{c['n']}-k{c['k']}-s{c['s']}")
+def test_same_tours_as_permutation_search(case):
+    cities = np.random.default_rng(case['seed']).integers(0, 1000, (case['n'], 2))
+    tour = pyramid_solve(TSP.from_cities(cities), k=case['k'], s=case['s'])
+    assert tour.tolist() == case['tour']
+
+
+@pytest.mark.parametrize('case', BASELINE[:3], ids=lambda c: f"seed{c['seed']}-n{c['n']}")
+def test_sparse_clustering_gives_same_tours(case):
+    cities = np.random.default_rng(case['seed']).integers(0, 1000, (case['n'], 2))
+    tour = pyramid_solve(TSP.from_cities(cities), k=case['k'], s=case['s'], sparse=True)
+    assert tour.tolist() == case['tour']